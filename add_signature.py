@@ -5,30 +5,51 @@ Adds a signature image and current date to PDF invoices
 """
 
 import argparse
+import csv
+import glob
+import hashlib
 import os
+import subprocess
+import sys
+import time
 from datetime import datetime
-from PIL import Image, ImageDraw, ImageFont
-from pypdf import PdfReader, PdfWriter
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
 import io
 
+# Pillow, pypdf and ReportLab are imported inside the functions that use them,
+# so --help, argument errors and the batch parent process start quickly
+from anchor_placement import DEFAULT_ANCHORS, DEFAULT_OFFSET, anchor_locator, anchor_position
+from bounded_cache import BoundedCache
+from instrumentation import resolve_metrics, stream_size
 
-def create_signature_overlay(signature_path, date_text, position, page_size):
-    """Create a PDF overlay with signature and date"""
+
+def create_signature_overlay(signature, date_text, position, page_size, add_date=True, sig_size=(150, 50),
+                             image_dpi=None):
+    """Create a PDF overlay with signature and date
+    
+    signature may be a SignatureAsset or anything load_signature_asset accepts.
+    With image_dpi, the embedded image is downsampled to that resolution at
+    the size it is drawn.
+    """
+    from pypdf import PdfReader
+    from reportlab.pdfgen import canvas
+    
     packet = io.BytesIO()
     
     # Create a new PDF with ReportLab
     c = canvas.Canvas(packet, pagesize=page_size)
     
     # Add signature image
-    if os.path.exists(signature_path):
+    if not isinstance(signature, (str, os.PathLike)) or os.path.exists(signature):
+        asset = signature if isinstance(signature, SignatureAsset) else load_signature_asset(signature)
         sig_x, sig_y = position
-        c.drawImage(signature_path, sig_x, sig_y, width=150, height=50, preserveAspectRatio=True)
+        sig_width, sig_height = sig_size
+        c.drawImage(asset.embed_reader_for(sig_size, image_dpi), sig_x, sig_y, width=sig_width, height=sig_height,
+                    preserveAspectRatio=True, mask='auto')
         
         # Add date below signature
-        c.setFont("Helvetica", 10)
-        c.drawString(sig_x + 30, sig_y - 5, date_text)
+        if add_date:
+            c.setFont("Helvetica", 10)
+            c.drawString(sig_x + sig_width * 0.2, sig_y - 5, date_text)
     
     c.save()
     
@@ -37,49 +58,611 @@ def create_signature_overlay(signature_path, date_text, position, page_size):
     return PdfReader(packet)
 
 
-def add_signature_to_pdf(input_pdf, output_pdf, signature_image, position=(400, 100)):
-    """Add signature and date to PDF"""
-    # Read the existing PDF
-    reader = PdfReader(input_pdf)
-    writer = PdfWriter()
+def _resolve_all(obj):
+    """Parse every object reachable from obj so later reads never touch its reader's stream
     
-    # Get current date in dd mm yyyy format
-    date_text = datetime.now().strftime("%d %m %Y")
+    PdfReader parses indirect objects on first access, seeking and reading
+    its one underlying stream, so two threads resolving objects of the same
+    reader at once can read each other's bytes. Once every object has been
+    resolved, pypdf serves them from its cache instead.
+    """
+    from pypdf.generic import IndirectObject
     
-    # Process each page
-    for page_num in range(len(reader.pages)):
-        page = reader.pages[page_num]
+    seen = set()
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, IndirectObject):
+            key = (obj.idnum, obj.generation)
+            if key in seen:
+                continue
+            seen.add(key)
+            obj = obj.get_object()
+        if isinstance(obj, dict):
+            stack.extend(dict.values(obj))
+        elif isinstance(obj, list):
+            stack.extend(obj)
+    return obj
+
+
+class OverlayCache:
+    """Bounded LRU cache of parsed signature overlay pages
+    
+    Overlays are keyed on everything that affects their content, so the same
+    pre-parsed page object can be merged into every matching target page
+    instead of re-running ReportLab and PdfReader for each one. Pages are
+    fully resolved before they are cached, so threads can share them.
+    """
+    
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._pages = BoundedCache(maxsize)
+    
+    def get(self, key, build):
+        """Return the overlay page for key, calling build() to create it on a miss"""
+        page = self._pages.get(key)
+        if page is not None:
+            return page
         
-        # Only add signature to the first page
-        if page_num == 0:
-            # Get page dimensions
-            page_box = page.mediabox
-            page_width = float(page_box.width)
-            page_height = float(page_box.height)
-            
-            # Create overlay with signature and date
-            overlay = create_signature_overlay(
-                signature_image, 
-                date_text, 
-                position,
-                (page_width, page_height)
-            )
+        # Build outside the lock; a concurrent miss on the same key just builds twice
+        page = build()
+        _resolve_all(page)
+        self._pages.put(key, page)
+        return page
+    
+    def stats(self):
+        """Return hit/miss counters and the current size"""
+        stats = self._pages.stats()
+        return {'hits': stats['hits'], 'misses': stats['misses'], 'size': stats['entries'], 'maxsize': self.maxsize}
+    
+    def clear(self):
+        """Drop all cached overlays and reset the counters"""
+        self._pages.clear()
+
+
+# Overlay cache shared by every call in this process (one per batch worker)
+overlay_cache = OverlayCache()
+
+_file_hashes = {}
+
+
+def signature_hash(signature):
+    """Return a content hash for a signature image path, file object, bytes or PIL image"""
+    if isinstance(signature, (str, os.PathLike)):
+        # Re-hash only when the file changes on disk
+        stat = os.stat(signature)
+        stamp = (os.fspath(signature), stat.st_mtime_ns, stat.st_size)
+        if stamp not in _file_hashes:
+            with open(signature, 'rb') as signature_file:
+                _file_hashes[stamp] = hashlib.sha256(signature_file.read()).hexdigest()
+        return _file_hashes[stamp]
+    
+    if isinstance(signature, SignatureAsset):
+        return signature.digest
+    
+    if isinstance(signature, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(signature).hexdigest()
+    
+    if hasattr(signature, 'getvalue'):
+        # Uploaded files: hash the encoded bytes without decoding the image
+        return hashlib.sha256(signature.getvalue()).hexdigest()
+    
+    digest = hashlib.sha256(f"{signature.mode}:{signature.size}".encode())
+    digest.update(signature.tobytes())
+    return digest.hexdigest()
+
+
+class SignatureAsset:
+    """A signature image decoded once and prepared for previews and PDF embedding
+    
+    The image is converted to RGBA (greyscale images to LA, which ReportLab
+    embeds as a one-channel image with a soft mask) and trimmed to the
+    bounding box of its non-transparent pixels, then scaled (keeping its
+    aspect ratio) to fit the preview box and the maximum embedding size.
+    Alpha is kept straight rather than premultiplied because both PIL
+    compositing and ReportLab's SMask expect it that way.
+    """
+    
+    PREVIEW_SIZE = (150, 50)
+    EMBED_SIZE = (600, 200)
+    
+    def __init__(self, image, digest):
+        from reportlab.lib.utils import ImageReader
+        
+        self.digest = digest
+        
+        image = image.convert('LA' if image.mode in ('1', 'L', 'LA') else 'RGBA')
+        bbox = image.getchannel('A').getbbox()
+        if bbox:
+            image = image.crop(bbox)
+        self.image = image
+        
+        self.preview = self._fit(image, self.PREVIEW_SIZE)
+        self.embed = self._fit(image, self.EMBED_SIZE)
+        
+        # ReportLab reads the pixels straight from memory, no temp file needed
+        self.embed_reader = ImageReader(self.embed)
+        self._downsampled = {}
+    
+    def embed_reader_for(self, box, dpi=None):
+        """Return the ImageReader to embed when drawing into box (in points), downsampled to dpi if given"""
+        from PIL import Image
+        from reportlab.lib.utils import ImageReader
+        
+        if dpi is None:
+            return self.embed_reader
+        width, height = self.embed.size
+        # drawImage fits the image to the box preserving its aspect ratio
+        scale = min(box[0] / width, box[1] / height) * dpi / 72
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        if size[0] >= width:
+            return self.embed_reader
+        if size not in self._downsampled:
+            # Pillow resamples RGBA with premultiplied alpha, so edges don't pick up dark fringes
+            self._downsampled[size] = ImageReader(self.embed.resize(size, Image.Resampling.LANCZOS))
+        return self._downsampled[size]
+    
+    @staticmethod
+    def _fit(image, box):
+        """Return image scaled down to fit within box, preserving aspect ratio"""
+        from PIL import Image
+        
+        fitted = image.copy()
+        fitted.thumbnail(box, Image.Resampling.LANCZOS)
+        return fitted
+
+
+# Decoded signatures by content hash, shared by every call in this process
+_signature_assets = BoundedCache(16)
+
+
+def load_signature_asset(signature):
+    """Return the SignatureAsset for a signature, decoding it once per content hash
+    
+    signature may be a path, an uploaded file object, encoded image bytes or a
+    PIL image.
+    """
+    if isinstance(signature, SignatureAsset):
+        return signature
+    
+    digest = signature_hash(signature)
+    asset = _signature_assets.get(digest)
+    if asset is not None:
+        return asset
+    
+    from PIL import Image
+    
+    if isinstance(signature, (bytes, bytearray, memoryview)):
+        image = Image.open(io.BytesIO(signature))
+    elif hasattr(signature, 'getvalue'):
+        image = Image.open(io.BytesIO(signature.getvalue()))
+    elif isinstance(signature, (str, os.PathLike)):
+        image = Image.open(signature)
+    else:
+        image = signature
+    asset = SignatureAsset(image, digest)
+    _signature_assets.put(digest, asset)
+    return asset
+
+
+def overlay_cache_key(signature_digest, date_text, position, page_size, add_date=True, sig_size=(150, 50),
+                      image_dpi=None):
+    """Return the overlay cache key for the given rendering parameters"""
+    return (
+        signature_digest,
+        date_text,
+        tuple(float(v) for v in position),
+        tuple(float(v) for v in sig_size),
+        tuple(float(v) for v in page_size),
+        bool(add_date),
+        image_dpi,
+    )
+
+
+def get_signature_overlay(signature, date_text, position, page_size, add_date=True, sig_size=(150, 50), cache=None,
+                          image_dpi=None):
+    """Return the overlay page for these parameters, building it only on a cache miss"""
+    cache = overlay_cache if cache is None else cache
+    key = overlay_cache_key(signature_hash(signature), date_text, position, page_size, add_date, sig_size, image_dpi)
+    return cache.get(
+        key,
+        lambda: create_signature_overlay(
+            signature, date_text, position, page_size, add_date, sig_size, image_dpi
+        ).pages[0]
+    )
+
+
+def add_signature_to_pdf(input_pdf, output_pdf, signature_image, position=(400, 100), incremental=False, pages='first',
+                         anchors=None, anchor_offset=DEFAULT_OFFSET, metrics=None, output_cache=None, image_dpi=None):
+    """Add signature and date to PDF, returning the number of pages processed
+    
+    input_pdf and output_pdf may be paths or binary file objects. pages is a
+    page selection spec such as "all", "last", "1-3,7" or "text:Authorised
+    signature" (see page_selection.select_pages); one overlay is built per
+    distinct page size and shared by every selected page of that size.
+    
+    With anchors (a list of phrases such as "Signature:"), each selected page
+    is signed next to the first anchor found on it, offset by anchor_offset,
+    and selected pages without an anchor are left unsigned. Anchor boxes are
+    memoized per page template, so repeat layouts skip text extraction.
+    
+    With incremental=True the signed pages are appended to the original bytes
+    as a PDF incremental update instead of rewriting every page, so memory use
+    and output cost stay flat regardless of page count.
+    
+    In both modes the overlay is drawn as one Form XObject per distinct
+    overlay, and its image and font are stored once per output document, so
+    signing more pages adds only a few small objects per page. image_dpi
+    downsamples the embedded signature to that resolution at its drawn size.
+    
+    metrics may be an instrumentation.SigningMetrics to collect per-stage
+    timings, byte counts and peak memory; if ADD_SIGNATURE_METRICS is set in
+    the environment, one is created and logged for every document.
+    
+    output_cache may be an output_cache.OutputCache; byte-identical inputs
+    signed with the same signature, options and date are then copied from it
+    instead of being signed again.
+    """
+    if output_cache is not None:
+        return _sign_through_cache(
+            output_cache, input_pdf, output_pdf, signature_image, metrics, position=tuple(position),
+            incremental=incremental, pages=pages, anchors=anchors, anchor_offset=tuple(anchor_offset),
+            image_dpi=image_dpi
+        )
+    
+    from pypdf import PdfReader, PdfWriter
+    from incremental_update import IncrementalUpdate, open_output
+    from mapped_file import MappedFile
+    from overlay_forms import OverlayForms
+    from page_selection import PageTextIndex, select_pages
+    
+    metrics = resolve_metrics(metrics, label=str(getattr(input_pdf, 'name', input_pdf)))
+    
+    if isinstance(input_pdf, (str, os.PathLike)):
+        # Map the file rather than letting PdfReader read all of it; pages are faulted in as they're
+        # parsed, and the incremental update copies the original bytes from the same descriptor
+        with metrics, MappedFile(input_pdf) as input_file:
+            return add_signature_to_pdf(input_file, output_pdf, signature_image, position, incremental, pages,
+                                        anchors, anchor_offset, metrics, image_dpi=image_dpi)
+    
+    with metrics:
+        metrics.bytes_in = stream_size(input_pdf)
+        
+        # Read the existing PDF; objects are parsed lazily as pages are touched
+        with metrics.stage('parse'):
+            reader = PdfReader(input_pdf)
+            metrics.pages = len(reader.pages)
+        
+        # Get current date in dd mm yyyy format
+        date_text = datetime.now().strftime("%d %m %Y")
+        
+        with metrics.stage('select'):
+            # Resolve the page rules; text is only extracted if a text rule asks for it
+            selected = select_pages(pages, len(reader.pages), PageTextIndex(reader))
+            if not selected:
+                raise ValueError(f"no pages match '{pages}'")
             
-            # Merge the overlay with the page
-            overlay_page = overlay.pages[0]
-            page.merge_page(overlay_page)
+            # Work out where the signature goes on each selected page
+            if anchors:
+                positions = {}
+                for page_num in selected:
+                    anchor_box = anchor_locator.locate(reader.pages[page_num], anchors, page_num)
+                    if anchor_box is not None:
+                        positions[page_num] = anchor_position(anchor_box, anchor_offset)
+                if not positions:
+                    raise ValueError(f"none of the anchors {list(anchors)} found on the selected pages")
+            else:
+                positions = {page_num: position for page_num in selected}
+            metrics.pages_signed = len(positions)
+        
+        overlays = {}
+        
+        def overlay_for(page, page_position):
+            # Fetch the (possibly cached) overlay with signature and date for this page size
+            page_box = page.mediabox
+            page_size = (float(page_box.width), float(page_box.height))
+            if (page_size, page_position) not in overlays:
+                with metrics.stage('overlay'):
+                    overlays[page_size, page_position] = get_signature_overlay(
+                        signature_image, date_text, page_position, page_size, image_dpi=image_dpi
+                    )
+            return overlays[page_size, page_position]
         
-        # Add the page to writer (signed or unsigned)
-        writer.add_page(page)
+        if incremental:
+            with metrics.stage('merge'):
+                update = IncrementalUpdate(reader)
+                for page_num, page_position in positions.items():
+                    update.merge_overlay(page_num, overlay_for(reader.pages[page_num], page_position))
+            with metrics.stage('write'):
+                metrics.bytes_out = update.write(input_pdf, output_pdf)
+            return len(reader.pages)
+        
+        writer = PdfWriter()
+        stamper = OverlayForms(writer._add_object)
+        
+        # Process each page
+        with metrics.stage('merge'):
+            for page_num, page in enumerate(reader.pages):
+                # Add the page to writer (signed or unsigned)
+                written_page = writer.add_page(page)
+                
+                # Draw the shared overlay form on the selected pages
+                if page_num in positions:
+                    stamper.stamp(written_page, overlay_for(page, positions[page_num]))
+        
+        # Write the output PDF
+        with metrics.stage('write'):
+            if isinstance(output_pdf, (str, os.PathLike)):
+                # Replaced only once complete, so the output may be the input being read
+                with open_output(output_pdf) as output_file:
+                    writer.write(output_file)
+                    metrics.bytes_out = output_file.tell()
+            else:
+                start = output_pdf.tell() if output_pdf.seekable() else None
+                writer.write(output_pdf)
+                if start is not None:
+                    metrics.bytes_out = output_pdf.tell() - start
+        
+        return len(reader.pages)
+
+
+def _sign_through_cache(output_cache, input_pdf, output_pdf, signature_image, metrics, **options):
+    """Copy the signed PDF from output_cache, or sign it and store the result"""
+    from mapped_file import MappedFile
+    from output_cache import file_digest
+    
+    if isinstance(input_pdf, (str, os.PathLike)):
+        # One mapping serves both the hash and, on a miss, the reader
+        with MappedFile(input_pdf) as input_file:
+            return _sign_through_cache(output_cache, input_file, output_pdf, signature_image, metrics, **options)
+    
+    key = output_cache.key(
+        file_digest(input_pdf), signature_hash(signature_image),
+        date_text=datetime.now().strftime("%d %m %Y"), add_date=True, sig_size=(150, 50), **options
+    )
+    page_count = output_cache.get(key, output_pdf)
+    if page_count is not None:
+        return page_count
+    
+    if isinstance(output_pdf, (str, os.PathLike)):
+        page_count = add_signature_to_pdf(input_pdf, output_pdf, signature_image, metrics=metrics, **options)
+        output_cache.put(key, output_pdf, page_count)
+    else:
+        # The output stream may be write-only or unseekable (stdout, a pipe), so sign
+        # into a temporary file and copy that to both the cache and the stream
+        import shutil
+        import tempfile
+        
+        with tempfile.TemporaryFile() as signed:
+            page_count = add_signature_to_pdf(input_pdf, signed, signature_image, metrics=metrics, **options)
+            signed.seek(0)
+            output_cache.put(key, signed, page_count)
+            signed.seek(0)
+            shutil.copyfileobj(signed, output_pdf)
+    return page_count
+
+
+def load_signing_modules():
+    """Import everything the signing path needs up front
+    
+    Called before starting worker processes so that forked workers inherit
+    the loaded modules instead of importing them one by one.
+    """
+    import PIL.Image
+    import pypdf
+    import reportlab.pdfgen.canvas
+    import incremental_update
+    import overlay_forms
+    import page_selection
+
+
+def profile_startup(argv, top=15):
+    """Re-run this command under -X importtime and report where start-up time went
+    
+    Import times are grouped by top-level package. The command's own output
+    is passed through, and its exit code is returned.
+    """
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.abspath(__file__), *argv],
+        stderr=subprocess.PIPE, text=True
+    )
+    wall = time.perf_counter() - start
+    
+    packages = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:'):
+            print(line, file=sys.stderr)
+            continue
+        fields = line[len('import time:'):].split('|')
+        if not fields[0].strip().isdigit():
+            continue  # Column header
+        package = fields[2].strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(fields[0])
     
-    # Write the output PDF
-    with open(output_pdf, 'wb') as output_file:
-        writer.write(output_file)
+    imports = sum(packages.values()) / 1000
+    print(f"\nStart-up profile: {wall * 1000:.0f} ms wall time, {imports:.0f} ms importing "
+          f"({len(packages)} packages)", file=sys.stderr)
+    for package, microseconds in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {microseconds / 1000:8.1f} ms  {package}", file=sys.stderr)
+    return completed.returncode
+
+
+def default_output_path(input_pdf, output_dir=None):
+    """Return the default signed output path for an input PDF"""
+    base_name = os.path.splitext(input_pdf)[0]
+    if output_dir:
+        base_name = os.path.join(output_dir, os.path.basename(base_name))
+    return f"{base_name}_signed.pdf"
+
+
+def is_batch_input(path):
+    """Return True if the input argument names a directory or a glob pattern"""
+    # An existing file is a single input even if its name looks like a pattern (inv[1].pdf)
+    if os.path.isfile(path):
+        return False
+    return os.path.isdir(path) or glob.has_magic(path)
+
+
+def collect_batch_jobs(source=None, manifest=None, output_dir=None):
+    """Build a list of (input, output) pairs from a directory, glob or manifest file
+    
+    A manifest is a CSV file with one ``input,output`` pair per line; the output
+    column may be left empty to use the default ``_signed.pdf`` name.
+    """
+    jobs = []
+    
+    if manifest:
+        with open(manifest, newline='') as manifest_file:
+            for row in csv.reader(manifest_file):
+                # Skip blank lines and comments
+                if not row or not row[0].strip() or row[0].startswith('#'):
+                    continue
+                input_pdf = row[0].strip()
+                output_pdf = row[1].strip() if len(row) > 1 and row[1].strip() else None
+                jobs.append((input_pdf, output_pdf or default_output_path(input_pdf, output_dir)))
+        return jobs
+    
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, '*.pdf')) + glob.glob(os.path.join(source, '*.PDF'))
+    else:
+        paths = glob.glob(source, recursive=True)
+    
+    for input_pdf in sorted(set(paths)):
+        # Don't re-sign the output of a previous run
+        if os.path.splitext(input_pdf)[0].endswith('_signed'):
+            continue
+        jobs.append((input_pdf, default_output_path(input_pdf, output_dir)))
+    
+    return jobs
+
+
+def _sign_job(input_pdf, output_pdf, signature_image, options):
+    """Sign one batch entry, returning (input_pdf, page_count, error)"""
+    try:
+        output_dir = os.path.dirname(output_pdf)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        pages = add_signature_to_pdf(input_pdf, output_pdf, signature_image, **options)
+        return input_pdf, pages, None
+    except Exception as e:
+        # Report the failure instead of raising so one bad PDF doesn't abort the batch
+        return input_pdf, 0, str(e)
+
+
+def _sign_isolated(input_pdf, output_pdf, signature_image, options):
+    """Sign one batch entry in a worker process of its own, reporting a crash as that file's error"""
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+    
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        try:
+            return executor.submit(_sign_job, input_pdf, output_pdf, signature_image, options).result()
+        except BrokenProcessPool:
+            return input_pdf, 0, "worker process died while signing this file"
+
+
+def sign_batch(jobs, signature_image, workers=None, quiet=False, **options):
+    """Sign many PDFs through a process pool and return a summary dict
+    
+    Each job is an (input, output) pair and options are passed on to
+    add_signature_to_pdf. Errors are collected per file rather than raised,
+    and progress is printed as each file completes.
+    
+    If a worker process dies (a crash in a C extension, SIGBUS, the OOM
+    killer), the pool is replaced and the rest of the batch carries on. The
+    files that were in flight at the time are retried one by one in their
+    own process, so only the file that kills its worker is reported failed.
+    """
+    total = len(jobs)
+    signed = 0
+    pages = 0
+    failures = []
+    done = 0
+    start = time.perf_counter()
+    
+    def record(input_pdf, page_count, error):
+        nonlocal signed, pages, done
+        done += 1
+        if error:
+            failures.append((input_pdf, error))
+        else:
+            signed += 1
+            pages += page_count
+        if quiet:
+            return
+        if error:
+            print(f"[{done}/{total}] FAILED {input_pdf}: {error}", file=sys.stderr)
+        else:
+            print(f"[{done}/{total}] {input_pdf} ({page_count} pages)")
+    
+    if workers == 1:
+        # Run inline to avoid process start-up cost for small batches
+        for input_pdf, output_pdf in jobs:
+            record(*_sign_job(input_pdf, output_pdf, signature_image, options))
+    else:
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+        from concurrent.futures.process import BrokenProcessPool
+        
+        load_signing_modules()
+        workers = workers or os.cpu_count() or 1
+        pending = list(reversed(jobs))
+        suspects = []
+        executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            in_flight = {}
+            while pending or in_flight:
+                # Only as many jobs in flight as workers, so a crash implicates as few files as possible
+                while pending and len(in_flight) < workers:
+                    job = pending.pop()
+                    in_flight[executor.submit(_sign_job, *job, signature_image, options)] = job
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                try:
+                    for future in finished:
+                        record(*future.result())
+                        del in_flight[future]
+                except BrokenProcessPool:
+                    # A worker died and took every job in flight with it
+                    suspects.extend(in_flight.values())
+                    in_flight.clear()
+                    executor.shutdown(wait=False)
+                    executor = ProcessPoolExecutor(max_workers=workers)
+        finally:
+            executor.shutdown()
+        
+        for input_pdf, output_pdf in suspects:
+            record(*_sign_isolated(input_pdf, output_pdf, signature_image, options))
+    
+    elapsed = time.perf_counter() - start
+    return {
+        'files': total,
+        'signed': signed,
+        'failed': len(failures),
+        'failures': failures,
+        'pages': pages,
+        'seconds': elapsed,
+        'files_per_second': signed / elapsed if elapsed > 0 else 0.0,
+        'pages_per_second': pages / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def print_batch_summary(summary):
+    """Print the throughput summary for a batch run"""
+    print(
+        f"Signed {summary['signed']} of {summary['files']} files "
+        f"({summary['failed']} failed, {summary['pages']} pages) "
+        f"in {summary['seconds']:.2f}s: "
+        f"{summary['files_per_second']:.1f} files/s, "
+        f"{summary['pages_per_second']:.1f} pages/s"
+    )
+    for input_pdf, error in summary['failures']:
+        print(f"  {input_pdf}: {error}")
 
 
 def main():
     parser = argparse.ArgumentParser(description='Add signature and date to PDF invoice')
-    parser.add_argument('input_pdf', help='Path to input PDF file')
+    parser.add_argument('input_pdf', nargs='?',
+                        help='Path to input PDF file, or a directory/glob pattern for batch mode')
     parser.add_argument('-o', '--output', help='Output PDF file path (default: input_signed.pdf)')
     parser.add_argument('-s', '--signature', default='signature.png', 
                         help='Path to signature image file (default: signature.png)')
@@ -87,18 +670,51 @@ def main():
                         help='X position for signature (default: 400)')
     parser.add_argument('-y', '--y-position', type=int, default=100,
                         help='Y position for signature (default: 100)')
+    parser.add_argument('-p', '--pages', default='first',
+                        help='Pages to sign: all, first, last, numbers/ranges like 1-3,7, '
+                             'or text:PHRASE for pages containing PHRASE (default: first)')
+    parser.add_argument('-a', '--anchor', action='append', dest='anchors', metavar='TEXT',
+                        help='Place the signature next to this text instead of at -x/-y (repeatable; '
+                             'the first anchor found on a page wins)')
+    parser.add_argument('--auto-place', action='store_true',
+                        help=f"Place the signature next to a default anchor ({', '.join(DEFAULT_ANCHORS)})")
+    parser.add_argument('--anchor-offset', type=float, nargs=2, default=DEFAULT_OFFSET, metavar=('DX', 'DY'),
+                        help='Offset of the signature from the end of the anchor text (default: %(default)s)')
+    parser.add_argument('-m', '--manifest',
+                        help='CSV file of input,output pairs to sign in batch mode')
+    parser.add_argument('-d', '--output-dir',
+                        help='Directory for signed files in batch mode (default: next to each input)')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='Number of worker processes in batch mode (default: CPU count)')
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help='Append the signature as a PDF incremental update instead of rewriting the file')
+    parser.add_argument('--image-dpi', type=int, metavar='DPI',
+                        help='Downsample the embedded signature image to this resolution at its drawn size '
+                             '(default: keep up to 600x200 pixels)')
+    parser.add_argument('--serve', choices=('stdio', 'http'),
+                        help='Run as a daemon with warm worker processes, taking JSON jobs on stdin '
+                             '(one per line) or over HTTP')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Address for --serve http to listen on (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=8765,
+                        help='Port for --serve http to listen on (default: %(default)s)')
+    parser.add_argument('--cache-dir',
+                        help='Reuse signed output for identical inputs from this directory '
+                             '(safe to share between concurrent runs)')
+    parser.add_argument('--cache-size', type=int, default=1024, metavar='MB',
+                        help='Size cap for --cache-dir; least recently used entries are evicted (default: 1024)')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Run the command and report import timings by package to stderr '
+                             '(profiles --help when no input is given)')
     
     args = parser.parse_args()
     
-    # Set default output filename if not provided
-    if not args.output:
-        base_name = os.path.splitext(args.input_pdf)[0]
-        args.output = f"{base_name}_signed.pdf"
+    if args.profile_startup:
+        argv = [arg for arg in sys.argv[1:] if arg != '--profile-startup']
+        return profile_startup(argv or ['--help'])
     
-    # Check if input file exists
-    if not os.path.exists(args.input_pdf):
-        print(f"Error: Input file '{args.input_pdf}' not found")
-        return 1
+    if not args.input_pdf and not args.manifest and not args.serve:
+        parser.error('an input PDF, directory, glob pattern or --manifest is required')
     
     # Check if signature file exists
     if not os.path.exists(args.signature):
@@ -106,13 +722,65 @@ def main():
         print("Please create a signature image file (PNG format recommended)")
         return 1
     
+    position = (args.x_position, args.y_position)
+    anchors = args.anchors or (list(DEFAULT_ANCHORS) if args.auto_place else None)
+    anchor_offset = tuple(args.anchor_offset)
+    
+    output_cache = None
+    if args.cache_dir:
+        from output_cache import OutputCache
+        output_cache = OutputCache(args.cache_dir, max_bytes=args.cache_size * 1024 * 1024)
+    
+    if args.serve:
+        # Imported here so one-shot runs don't pay for the server modules
+        from signing_service import SigningService, serve_http, serve_stdio
+        with SigningService(args.signature, workers=args.jobs, position=position, pages=args.pages,
+                            incremental=args.incremental, anchors=anchors, anchor_offset=anchor_offset,
+                            output_cache=output_cache, image_dpi=args.image_dpi) as service:
+            if args.serve == 'http':
+                serve_http(service, args.host, args.port)
+            else:
+                serve_stdio(service)
+        return 0
+    
+    if args.manifest or is_batch_input(args.input_pdf):
+        if args.manifest and not os.path.exists(args.manifest):
+            print(f"Error: Manifest file '{args.manifest}' not found")
+            return 1
+        jobs = collect_batch_jobs(args.input_pdf, args.manifest, args.output_dir)
+        if not jobs:
+            print("Error: No PDF files found to sign")
+            return 1
+        summary = sign_batch(
+            jobs, args.signature, workers=args.jobs,
+            position=position, incremental=args.incremental, pages=args.pages,
+            anchors=anchors, anchor_offset=anchor_offset, output_cache=output_cache, image_dpi=args.image_dpi
+        )
+        print_batch_summary(summary)
+        return 1 if summary['failed'] else 0
+    
+    # Set default output filename if not provided
+    if not args.output:
+        args.output = default_output_path(args.input_pdf)
+    
+    # Check if input file exists
+    if not os.path.exists(args.input_pdf):
+        print(f"Error: Input file '{args.input_pdf}' not found")
+        return 1
+    
     try:
         # Add signature to PDF
         add_signature_to_pdf(
             args.input_pdf,
             args.output,
             args.signature,
-            position=(args.x_position, args.y_position)
+            position=position,
+            incremental=args.incremental,
+            pages=args.pages,
+            anchors=anchors,
+            anchor_offset=anchor_offset,
+            output_cache=output_cache,
+            image_dpi=args.image_dpi
         )
         print(f"Successfully added signature to {args.output}")
         
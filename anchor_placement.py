@@ -0,0 +1,171 @@
+"""
+Anchor-Based Signature Placement
+Finds anchor text such as "Signature:" on a page and positions the signature next to it
+"""
+
+import hashlib
+import re
+
+from bounded_cache import BoundedCache
+
+DEFAULT_ANCHORS = ("Signature:", "Authorised by", "Authorized by")
+
+# Offset of the signature's bottom-left corner from the end of the anchor text's baseline
+DEFAULT_OFFSET = (10, -10)
+
+_SUBSET_PREFIX = re.compile(r"^[A-Z]{6}\+")
+_WHITESPACE = re.compile(r"\s+")
+# Literal and hex string operands in a content stream: the text a page shows
+_TEXT_STRING = re.compile(rb"\((?:\\.|[^\\()])*\)|<[0-9A-Fa-f\s]*>", re.DOTALL)
+
+# Marks a locator miss, since None (no anchor on the page) is a cached result
+_NOT_CACHED = object()
+
+
+def _text_width(text, font_dict, font_size):
+    """Estimate the width of text in text space units"""
+    if font_dict is not None:
+        widths = font_dict.get("/Widths")
+        first_char = font_dict.get("/FirstChar")
+        if widths is not None and first_char is not None:
+            widths = widths.get_object()
+            total = 0
+            for char in text:
+                index = ord(char) - int(first_char)
+                total += float(widths[index]) if 0 <= index < len(widths) else 500
+            return total * font_size / 1000
+
+        # Standard 14 fonts carry no /Widths, but ReportLab knows their metrics
+        from reportlab.pdfbase import pdfmetrics
+        
+        base_font = _SUBSET_PREFIX.sub("", str(font_dict.get("/BaseFont", "")).lstrip("/"))
+        try:
+            return pdfmetrics.stringWidth(text, base_font, font_size)
+        except Exception:
+            pass
+
+    # Average glyph width for unknown fonts
+    return len(text) * font_size * 0.5
+
+
+def find_anchor(page, anchors=DEFAULT_ANCHORS):
+    """Return the (x, y, width, height) box of the first anchor found on the page, or None
+
+    Anchors are matched case-insensitively within each text run reported by
+    pypdf's text visitor, in the order given. The box is in default user space,
+    with y at the text baseline.
+    """
+    wanted = [(anchor, _WHITESPACE.sub(" ", anchor).strip().casefold()) for anchor in anchors]
+    found = {}
+
+    def visitor(text, cm, tm, font_dict, font_size):
+        if not text.strip():
+            return
+        normalized = _WHITESPACE.sub(" ", text)
+        run = normalized.casefold()
+        for anchor, needle in wanted:
+            if anchor in found:
+                continue
+            offset = run.find(needle)
+            if offset < 0:
+                continue
+            # Text matrix combined with the CTM gives the run's origin on the page
+            x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4]
+            y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5]
+            scale = (tm[0] ** 2 + tm[1] ** 2) ** 0.5 * (cm[0] ** 2 + cm[1] ** 2) ** 0.5
+            x += _text_width(normalized[:offset], font_dict, font_size) * scale
+            width = _text_width(normalized[offset:offset + len(needle)], font_dict, font_size) * scale
+            found[anchor] = (x, y, width, font_size * scale)
+
+    page.extract_text(visitor_text=visitor)
+
+    for anchor, _ in wanted:
+        if anchor in found:
+            return found[anchor]
+    return None
+
+
+def _static_content(stream):
+    """Return a content stream's bytes with its text string operands emptied"""
+    return _TEXT_STRING.sub(b"()", stream.get_data())
+
+
+def template_fingerprint(page):
+    """Hash the parts of a page that identify its template rather than its data
+
+    Documents generated from the same template draw the same lines, boxes,
+    images and text positions in the same fonts, while the strings they show
+    (amounts, dates, line items) differ. The fingerprint covers the page
+    size, fonts and images plus the content streams, its own and those of
+    its Form XObjects, with every string operand emptied; a page whose
+    layout differs in any operator or coordinate gets a different
+    fingerprint.
+    """
+    digest = hashlib.sha256()
+    box = page.mediabox
+    digest.update(repr((float(box.left), float(box.bottom), float(box.width), float(box.height))).encode())
+    digest.update(repr(page.get("/Rotate", 0)).encode())
+
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(_static_content(contents))
+
+    resources = page.get("/Resources")
+    resources = resources.get_object() if resources is not None else {}
+
+    fonts = resources.get("/Font")
+    if fonts is not None:
+        for name, font in sorted(fonts.get_object().items()):
+            font = font.get_object()
+            digest.update(repr((name, font.get("/Subtype"), font.get("/BaseFont"))).encode())
+
+    xobjects = resources.get("/XObject")
+    if xobjects is not None:
+        for name, xobject in sorted(xobjects.get_object().items()):
+            xobject = xobject.get_object()
+            digest.update(repr((name, xobject.get("/Subtype"), xobject.get("/Width"), xobject.get("/Height"))).encode())
+            if xobject.get("/Subtype") == "/Form":
+                # Forms can draw text of their own
+                digest.update(_static_content(xobject))
+
+    return digest.hexdigest()
+
+
+def anchor_position(anchor_box, offset=DEFAULT_OFFSET):
+    """Return the signature position for an anchor box, offset from the anchor's end"""
+    x, y, width, _ = anchor_box
+    return (x + width + offset[0], y + offset[1])
+
+
+class AnchorLocator:
+    """Finds anchor text on pages, memoizing results per template fingerprint
+
+    Repeat documents from the same template reuse the anchor box found on the
+    first one, so only the fingerprint (decompressing and hashing the content
+    stream) is computed and text extraction is skipped entirely. Misses are
+    memoized too. Pages of one document usually share their fonts, so the
+    page index is part of the key to keep, say, a cover page from inheriting
+    the last page's anchor.
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._boxes = BoundedCache(maxsize)
+
+    def locate(self, page, anchors=DEFAULT_ANCHORS, page_index=0):
+        """Return the anchor box on page (see find_anchor), or None"""
+        key = (template_fingerprint(page), page_index, tuple(anchors))
+        box = self._boxes.get(key, _NOT_CACHED)
+        if box is _NOT_CACHED:
+            box = find_anchor(page, anchors)
+            self._boxes.put(key, box)
+        return box
+
+    def stats(self):
+        """Return hit/miss counters and the current size"""
+        stats = self._boxes.stats()
+        return {'hits': stats['hits'], 'misses': stats['misses'], 'size': stats['entries'], 'maxsize': self.maxsize}
+
+
+# Locator shared by every call in this process (one per batch worker)
+anchor_locator = AnchorLocator()
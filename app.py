@@ -1,18 +1,45 @@
 import streamlit as st
 import os
 from datetime import datetime
-from PIL import Image
 import io
 import base64
 from pypdf import PdfReader, PdfWriter
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
 import tempfile
-import pdf2image
-from streamlit_drawable_canvas import st_canvas
-import numpy as np
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import hashlib
+import threading
+import shutil
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import streamlit.components.v1 as components
+from add_signature import OverlayCache, SignatureAsset, load_signature_asset, overlay_cache_key
+from anchor_placement import DEFAULT_ANCHORS, anchor_locator, anchor_position
+from bounded_cache import BoundedCache
+from incremental_update import IncrementalUpdate
+from instrumentation import STAGES, SigningMetrics, resolve_metrics, stream_size
+from mapped_file import MappedFile
+from overlay_forms import OverlayForms
+from page_selection import PageTextIndex, select_pages
+
+# Page rules offered in the UI, mapped to page selection specs (None means the selected page)
+PAGE_RULES = {"Selected page": None, "All pages": "all", "Last page": "last", "Custom": None}
+
+# Signed output is kept in memory up to this size, then spooled to disk
+OUTPUT_SPOOL_SIZE = 16 * 1024 * 1024
+
+# Resolution and memory budget for rendered page previews
+PREVIEW_DPI = 150
+PREVIEW_CACHE_BYTES = 256 * 1024 * 1024
+
+# Signing runs on background threads shared by all sessions; at most this many jobs may be queued or running
+SIGNING_WORKERS = 2
+SIGNING_QUEUE_SIZE = 16
+
+# Memory budget for signed documents kept for download
+SIGNED_CACHE_BYTES = 256 * 1024 * 1024
+
+# Threads that sign the files of a bulk job, and how many signed files may wait to be zipped per worker
+BULK_WORKERS = min(8, os.cpu_count() or 1)
+BULK_WINDOW = 2
 
 st.set_page_config(page_title="PDF Signature Tool", page_icon="✍️", layout="wide")
 
@@ -26,32 +53,29 @@ if 'signature_y' not in st.session_state:
     st.session_state.signature_y = 100
 if 'selected_page' not in st.session_state:
     st.session_state.selected_page = 1
+if 'pages_to_sign' not in st.session_state:
+    st.session_state.pages_to_sign = "Selected page"
 if 'add_date' not in st.session_state:
     st.session_state.add_date = True
 
-def create_signature_overlay(signature_image, date_text, position, page_size, add_date=True, sig_width=150, sig_height=50):
+def create_signature_overlay(signature_asset, date_text, position, page_size, add_date=True, sig_width=150, sig_height=50):
     """Create a PDF overlay with signature and optionally date"""
+    from reportlab.pdfgen import canvas
+    
     packet = io.BytesIO()
     
     # Create a new PDF with ReportLab
     c = canvas.Canvas(packet, pagesize=page_size)
     
-    # Save signature image to temp file
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp_file:
-        signature_image.save(tmp_file.name, 'PNG')
-        tmp_file_path = tmp_file.name
+    # The asset's pre-scaled image is handed to ReportLab in memory
+    sig_x, sig_y = position
+    c.drawImage(signature_asset.embed_reader, sig_x, sig_y, width=sig_width, height=sig_height,
+                preserveAspectRatio=True, mask='auto')
     
-    try:
-        sig_x, sig_y = position
-        c.drawImage(tmp_file_path, sig_x, sig_y, width=sig_width, height=sig_height, preserveAspectRatio=True)
-        
-        # Add date below signature if requested
-        if add_date:
-            c.setFont("Helvetica", 10)
-            c.drawString(sig_x + sig_width * 0.3, sig_y - 10, date_text)
-    finally:
-        # Clean up temp file
-        os.unlink(tmp_file_path)
+    # Add date below signature if requested
+    if add_date:
+        c.setFont("Helvetica", 10)
+        c.drawString(sig_x + sig_width * 0.3, sig_y - 10, date_text)
     
     c.save()
     
@@ -59,101 +83,640 @@ def create_signature_overlay(signature_image, date_text, position, page_size, ad
     packet.seek(0)
     return PdfReader(packet)
 
-def add_signature_to_pdf(pdf_file, signature_image, position, selected_page=1, add_date=True, sig_dimensions=(150, 50)):
-    """Add signature and optionally date to specified page of PDF"""
-    # Read the existing PDF
-    reader = PdfReader(pdf_file)
-    writer = PdfWriter()
+@st.cache_resource
+def get_overlay_cache():
+    """Overlay cache shared by all sessions of this server process"""
+    return OverlayCache()
+
+def add_signature_to_pdf(pdf_file, signature_asset, position, selected_page=1, add_date=True, sig_dimensions=(150, 50), reader=None, pages=None, text_index=None, metrics=None, progress=None, overlay_cache=None, reference_size=None):
+    """Add signature and optionally date to specified pages of PDF
+    
+    pages is a page selection spec such as "all", "last", "1-3" or
+    "text:Authorised signature"; it defaults to just selected_page. One
+    overlay is built per distinct page size and shared by every page of that
+    size.
+    
+    The signed pages are appended to the original bytes as an incremental
+    update, so only those pages are parsed, and the result is streamed into a
+    spooled temporary file instead of an in-memory buffer. Encrypted PDFs,
+    which can't be updated incrementally, fall back to rewriting every page.
     
-    # Get current date in dd mm yyyy format
-    date_text = datetime.now().strftime("%d %m %Y")
+    reader may be an already-parsed PdfReader over the same bytes, with
+    text_index its PageTextIndex; the reader is left unmodified and reused
+    unless the PDF is encrypted.
     
-    # Process each page
-    for page_num in range(len(reader.pages)):
-        page = reader.pages[page_num]
+    metrics may be an instrumentation.SigningMetrics to collect per-stage
+    timings, byte counts and peak memory (see add_signature.add_signature_to_pdf).
+    
+    progress, if given, is called as progress(done, total) as pages are
+    signed; raising from it (see SigningJob.report) aborts the run. Pass
+    overlay_cache when calling from a background thread, where Streamlit's
+    cached resources aren't available.
+    
+    position and sig_dimensions are in the coordinates of a page of
+    reference_size, if given, and are scaled to each page's own mediabox, so
+    a position chosen on one document carries over to other page sizes.
+    """
+    metrics = resolve_metrics(metrics)
+    with metrics:
+        metrics.bytes_in = stream_size(pdf_file)
+        
+        # Read the existing PDF unless a parsed reader can be reused
+        with metrics.stage('parse'):
+            if reader is None or reader.is_encrypted:
+                reader = PdfReader(pdf_file)
+                text_index = None
+            if text_index is None:
+                text_index = PageTextIndex(reader)
+            metrics.pages = len(reader.pages)
+        
+        # Get current date in dd mm yyyy format
+        date_text = datetime.now().strftime("%d %m %Y")
         
-        # Add signature to the selected page (convert from 1-based to 0-based indexing)
-        if page_num == selected_page - 1:
-            # Get page dimensions
+        # Resolve which pages to sign (selected_page is 1-based, like the spec)
+        with metrics.stage('select'):
+            if pages is None:
+                pages = str(selected_page)
+            page_indices = select_pages(pages, len(reader.pages), text_index)
+            if not page_indices:
+                raise ValueError(f"No pages match '{pages}'")
+            metrics.pages_signed = len(page_indices)
+        
+        if overlay_cache is None:
+            overlay_cache = get_overlay_cache()
+        if progress is None:
+            progress = lambda done, total: None
+        overlays = {}
+        
+        def overlay_for(page):
+            # Fetch the overlay for this page size from the cache, creating it on a miss
             page_box = page.mediabox
-            page_width = float(page_box.width)
-            page_height = float(page_box.height)
+            page_size = (float(page_box.width), float(page_box.height))
+            if page_size not in overlays:
+                page_position, page_dimensions = position, sig_dimensions
+                if reference_size is not None:
+                    scale_x = page_size[0] / reference_size[0]
+                    scale_y = page_size[1] / reference_size[1]
+                    page_position = (position[0] * scale_x, position[1] * scale_y)
+                    page_dimensions = (sig_dimensions[0] * scale_x, sig_dimensions[1] * scale_y)
+                key = overlay_cache_key(
+                    signature_asset.digest, date_text, page_position, page_size, add_date, page_dimensions
+                )
+                with metrics.stage('overlay'):
+                    overlays[page_size] = overlay_cache.get(
+                        key,
+                        lambda: create_signature_overlay(
+                            signature_asset, 
+                            date_text, 
+                            page_position,
+                            page_size,
+                            add_date,
+                            page_dimensions[0],
+                            page_dimensions[1]
+                        ).pages[0]
+                    )
+            return overlays[page_size]
+        
+        output = tempfile.SpooledTemporaryFile(max_size=OUTPUT_SPOOL_SIZE)
+        
+        if reader.is_encrypted:
+            writer = PdfWriter()
+            stamper = OverlayForms(writer._add_object)
+            page_indices = set(page_indices)
+            with metrics.stage('merge'):
+                for page_num, page in enumerate(reader.pages):
+                    progress(page_num, len(reader.pages))
+                    written_page = writer.add_page(page)
+                    if page_num in page_indices:
+                        stamper.stamp(written_page, overlay_for(page))
+            with metrics.stage('write'):
+                writer.write(output)
+        else:
+            with metrics.stage('merge'):
+                update = IncrementalUpdate(reader)
+                for done, page_num in enumerate(page_indices):
+                    progress(done, len(page_indices))
+                    update.merge_overlay(page_num, overlay_for(reader.pages[page_num]))
+            with metrics.stage('write'):
+                update.write(pdf_file, output)
+        
+        metrics.bytes_out = output.tell()
+        progress(len(page_indices), len(page_indices))
+        output.seek(0)
+        return output
+
+def show_diagnostics(metrics):
+    """Show per-stage timings and sizes from a signing run in a collapsed panel"""
+    with st.expander("🔍 Diagnostics", expanded=False):
+        seconds = metrics['seconds']
+        st.table({
+            "Stage": [stage for stage in STAGES if stage in seconds],
+            "Milliseconds": [round(seconds[stage] * 1000, 2) for stage in STAGES if stage in seconds],
+        })
+        
+        peak = metrics['tracemalloc_peak_bytes']
+        st.caption(
+            f"Total {metrics['total_seconds'] * 1000:.1f} ms · "
+            f"{metrics['pages_signed'] or 0} of {metrics['pages'] or 0} pages signed · "
+            f"{(metrics['bytes_in'] or 0) / 1024:.1f} KB in, {(metrics['bytes_out'] or 0) / 1024:.1f} KB out"
+            + (f" · peak traced memory {peak / 1024 / 1024:.1f} MB" if peak is not None else "")
+        )
+        if metrics['error']:
+            st.caption(f"Failed: {metrics['error']}")
+        st.json(metrics, expanded=False)
+
+class SigningCancelled(Exception):
+    """Raised inside a signing job once its user has cancelled it"""
+
+class SigningJob:
+    """A signing request on the background queue, kept in session state and polled for progress"""
+    
+    def __init__(self, label, result_key):
+        self.label = label
+        self.result_key = result_key
+        self.status = "queued"
+        self.done = 0
+        self.total = 0
+        self.error = None
+        self.metrics = None
+        self.future = None
+        # Bulk jobs only: per-file status rows and the ZIP archive on disk
+        self.files = None
+        self.archive = None
+        self._cancel = threading.Event()
+    
+    @property
+    def finished(self):
+        return self.status in ("done", "failed", "cancelled")
+    
+    def cancel(self):
+        """Stop the job at its next progress report, or drop it if it hasn't started"""
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            self.status = "cancelled"
+    
+    def check_cancelled(self, *args):
+        """Raise SigningCancelled if the job has been cancelled; usable as a progress callback"""
+        if self._cancel.is_set():
+            raise SigningCancelled()
+    
+    def report(self, done, total):
+        """Progress callback for the signing code; raises SigningCancelled once cancelled"""
+        self.check_cancelled()
+        self.done, self.total = done, total
+
+class SigningQueue:
+    """Bounded pool of background threads that run signing jobs for every session
+    
+    Jobs past max_pending are refused rather than queued without limit, so a
+    burst of requests can't pile up work (and memory) on the server.
+    """
+    
+    def __init__(self, workers, max_pending):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="signing")
+        self._slots = threading.BoundedSemaphore(max_pending)
+    
+    def submit(self, job, work):
+        """Run work(job) in the background; raises RuntimeError if the queue is full"""
+        if not self._slots.acquire(blocking=False):
+            raise RuntimeError("The signing queue is full; please try again in a moment")
+        job.future = self._executor.submit(self._run, job, work)
+        job.future.add_done_callback(lambda _: self._slots.release())
+        return job
+    
+    @staticmethod
+    def _run(job, work):
+        if job._cancel.is_set():
+            job.status = "cancelled"
+            return
+        job.status = "running"
+        try:
+            work(job)
+            job.status = "done"
+        except SigningCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+
+class SignedCache(BoundedCache):
+    """Thread-safe LRU cache of signed PDF bytes bounded by a memory budget"""
+    
+    def __init__(self, max_bytes):
+        super().__init__(max_bytes, sizeof=len)
+
+def signed_file_names(names):
+    """Return the signed output name for each upload, numbering duplicates"""
+    seen = {}
+    result = []
+    for name in names:
+        base = os.path.splitext(name)[0] + "_signed"
+        count = seen.get(base, 0) + 1
+        seen[base] = count
+        result.append(f"{base}.pdf" if count == 1 else f"{base} ({count}).pdf")
+    return result
+
+def sign_files_to_zip(job, uploads, sign_file, executor):
+    """Sign uploads concurrently on executor, adding each to the job's ZIP archive as it completes
+    
+    sign_file(upload) returns (signed file object, pages signed). The archive
+    is written to a temporary file as results arrive, and only a few signed
+    files are in flight at once, so memory stays bounded however many files
+    there are. A failure is recorded against its file and the rest carry on.
+    """
+    job.total = len(uploads)
+    job.files = [{"File": upload.name, "Status": "queued", "Pages": None, "Error": ""} for upload in uploads]
+    job.archive = tempfile.TemporaryFile(suffix=".zip")
+    names = signed_file_names([upload.name for upload in uploads])
+    remaining = iter(enumerate(uploads))
+    pending = {}
+    
+    def fill():
+        # Keep a bounded number of files signing or waiting to be zipped
+        while len(pending) < BULK_WORKERS * BULK_WINDOW:
+            index, upload = next(remaining, (None, None))
+            if upload is None:
+                return
+            job.files[index]["Status"] = "signing"
+            pending[executor.submit(sign_file, upload)] = index
+    
+    # PDFs are already compressed, so entries are stored rather than deflated again
+    with zipfile.ZipFile(job.archive, "w", zipfile.ZIP_STORED) as archive:
+        fill()
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index = pending.pop(future)
+                row = job.files[index]
+                try:
+                    signed_pdf, pages_signed = future.result()
+                except SigningCancelled:
+                    row["Status"] = "cancelled"
+                except Exception as e:
+                    row["Status"] = "failed"
+                    row["Error"] = str(e)
+                else:
+                    with archive.open(names[index], "w") as entry:
+                        shutil.copyfileobj(signed_pdf, entry)
+                    signed_pdf.close()
+                    row["Status"] = "signed"
+                    row["Pages"] = pages_signed
+                job.done += 1
             
-            # Create overlay with signature and optionally date
-            overlay = create_signature_overlay(
-                signature_image, 
-                date_text, 
-                position,
-                (page_width, page_height),
-                add_date,
-                sig_dimensions[0],
-                sig_dimensions[1]
+            if job._cancel.is_set():
+                for future, index in pending.items():
+                    future.cancel()
+                    job.files[index]["Status"] = "cancelled"
+                wait(pending)
+                for row in job.files:
+                    if row["Status"] in ("queued", "signing"):
+                        row["Status"] = "cancelled"
+                raise SigningCancelled()
+            fill()
+    job.archive.flush()
+
+def read_archive(job):
+    """Return the bytes of a bulk job's ZIP archive, for the deferred download"""
+    job.archive.seek(0)
+    return job.archive.read()
+
+@st.cache_resource
+def get_bulk_executor():
+    """Threads that sign the individual files of bulk jobs
+    
+    pypdf and ReportLab are pure Python and hold the GIL, so the threads
+    overlap I/O and keep the page responsive rather than using several
+    cores; the CLI batch mode signs with worker processes.
+    """
+    return ThreadPoolExecutor(max_workers=BULK_WORKERS, thread_name_prefix="bulk-signing")
+
+@st.cache_resource
+def get_signing_queue():
+    """Signing queue shared by all sessions of this server process"""
+    return SigningQueue(SIGNING_WORKERS, SIGNING_QUEUE_SIZE)
+
+@st.cache_resource
+def get_signed_cache():
+    """Signed documents shared by all sessions, keyed by everything that affects the output"""
+    return SignedCache(SIGNED_CACHE_BYTES)
+
+@st.fragment(run_every=0.5)
+def signing_progress():
+    """Poll the session's running signing job, rerunning only this fragment"""
+    job = st.session_state.signing_job
+    if job.finished:
+        # Rerun the whole app to show the result and stop polling
+        st.rerun()
+    
+    if job.status == "queued":
+        st.progress(0.0, text=f"Waiting to sign {job.label}...")
+    else:
+        fraction = job.done / job.total if job.total else 0.0
+        unit = "files" if job.files is not None else "pages"
+        st.progress(fraction, text=f"Signing {job.label}: {job.done} of {job.total} {unit}")
+    if st.button("✖️ Cancel"):
+        job.cancel()
+    if job.files is not None:
+        st.dataframe(job.files, hide_index=True)
+
+def show_signing_result(job):
+    """Show the outcome of a finished signing job, with its download"""
+    if job.metrics is not None:
+        st.session_state.last_metrics = job.metrics
+    
+    if job.status == "failed":
+        st.error(f"Could not sign PDF: {job.error}")
+    elif job.status == "cancelled":
+        st.info("Signing cancelled")
+    elif job.files is not None:
+        signed = sum(1 for row in job.files if row["Status"] == "signed")
+        failed = len(job.files) - signed
+        if failed:
+            st.warning(f"Signed {signed} of {len(job.files)} PDFs; {failed} failed")
+        else:
+            st.success(f"✅ Signed all {signed} PDFs!")
+        st.dataframe(job.files, hide_index=True)
+        if signed:
+            # The archive is read from disk only when the button is clicked
+            st.download_button(
+                label="📥 Download Signed PDFs (ZIP)",
+                data=lambda: read_archive(job),
+                file_name="signed_pdfs.zip",
+                mime="application/zip"
             )
-            
-            # Merge the overlay with the page
-            overlay_page = overlay.pages[0]
-            page.merge_page(overlay_page)
+    else:
+        signed_data = get_signed_cache().get(job.result_key)
+        if signed_data is None:
+            st.warning("The signed PDF is no longer cached; please sign it again")
+            return
+        st.success("✅ PDF signed successfully!")
+        st.download_button(
+            label="📥 Download Signed PDF",
+            data=signed_data,
+            file_name=job.label.replace('.pdf', '_signed.pdf'),
+            mime="application/pdf"
+        )
+
+def _image_bytes(image):
+    return image.width * image.height * len(image.getbands())
+
+class PreviewCache:
+    """Thread-safe LRU cache of rendered page images bounded by a memory budget"""
+    
+    def __init__(self, max_bytes):
+        self._images = BoundedCache(max_bytes, sizeof=_image_bytes)
+        self._inflight = {}
+        self._lock = threading.Lock()
+    
+    def get_or_render(self, key, render):
+        """Return the cached image for key, waiting on a prefetch or rendering it if needed"""
+        image = self._images.get(key)
+        if image is not None:
+            return image
+        with self._lock:
+            future = self._inflight.get(key)
         
-        # Add the page to writer (signed or unsigned)
-        writer.add_page(page)
+        if future is not None:
+            return future.result()
+        # A prefetch stores its image before it stops being in flight, so it may have just landed
+        image = self._images.get(key)
+        if image is not None:
+            return image
+        
+        image = render()
+        if image is not None:
+            self._images.put(key, image)
+        return image
+    
+    def prefetch(self, key, render, executor):
+        """Render key in the background unless it is already cached or in flight"""
+        with self._lock:
+            if key in self._images or key in self._inflight:
+                return
+            # Registered under the lock so the job can't finish before it is tracked
+            self._inflight[key] = executor.submit(self._prefetch_job, key, render)
     
-    # Write to bytes
-    output_bytes = io.BytesIO()
-    writer.write(output_bytes)
-    output_bytes.seek(0)
+    def _prefetch_job(self, key, render):
+        try:
+            image = render()
+            if image is not None:
+                self._images.put(key, image)
+            return image
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+@st.cache_resource
+def get_preview_cache():
+    """Preview cache shared by all sessions of this server process"""
+    return PreviewCache(PREVIEW_CACHE_BYTES)
+
+@st.cache_resource
+def get_prefetch_executor():
+    """Background threads that render pages next to the one being viewed"""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="preview-prefetch")
+
+def render_page(pdf_path, page_num, dpi=PREVIEW_DPI):
+    """Rasterize a single page of a PDF file with poppler"""
+    # Imported on first render; sessions that never preview don't load it
+    import pdf2image
     
-    return output_bytes
+    images = pdf2image.convert_from_path(pdf_path, first_page=page_num, last_page=page_num, dpi=dpi)
+    return images[0] if images else None
 
-def pdf_to_image(pdf_file, page_num=1):
-    """Convert specified page of PDF to image for preview"""
+def pdf_to_image(document, page_num=1, dpi=PREVIEW_DPI):
+    """Convert specified page of PDF to image for preview
+    
+    Rendered pages are cached by (content hash, page, dpi), so reruns don't
+    re-rasterize, and the adjacent pages are prefetched in the background.
+    """
+    pdf_path = document.path
+    cache = get_preview_cache()
+    
     try:
-        # Use pdf2image to convert PDF to image
-        images = pdf2image.convert_from_bytes(pdf_file.read(), first_page=page_num, last_page=page_num, dpi=150)
-        pdf_file.seek(0)  # Reset file pointer
-        return images[0] if images else None
+        image = cache.get_or_render((document.digest, page_num, dpi), lambda: render_page(pdf_path, page_num, dpi))
     except Exception as e:
         st.error(f"Error converting PDF to image: {str(e)}")
         return None
+    
+    # Warm the neighbouring pages so paging through the document is instant
+    executor = get_prefetch_executor()
+    for neighbour in (page_num + 1, page_num - 1):
+        if 1 <= neighbour <= document.num_pages:
+            cache.prefetch(
+                (document.digest, neighbour, dpi),
+                lambda neighbour=neighbour: render_page(pdf_path, neighbour, dpi),
+                executor
+            )
+    
+    return image
+
+# Drag-and-drop positioning that runs in the browser and reports only the final position
+signature_positioner = components.declare_component(
+    "signature_positioner",
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "components", "signature_positioner")
+)
+
+@st.cache_data(max_entries=32)
+def image_data_url(_image, cache_key, image_format):
+    """Encode an image as a data URL once per cache_key"""
+    buffer = io.BytesIO()
+    image = _image.convert("RGB") if image_format == "JPEG" else _image
+    image.save(buffer, image_format, quality=85)
+    mime = "image/jpeg" if image_format == "JPEG" else "image/png"
+    return f"data:{mime};base64,{base64.b64encode(buffer.getvalue()).decode()}"
+
+def drawn_signature_asset(image_data):
+    """Return the SignatureAsset for the drawing canvas contents, or None while it is blank
+    
+    The alpha channel is thresholded once to find the rows and columns with
+    ink, so a blank canvas is detected and the empty margins are dropped
+    without building a PIL image. The cropped strokes are reduced to
+    greyscale plus alpha, which keeps their anti-aliased edges at half the
+    size of RGBA, and hashed; an unchanged drawing reuses the session's
+    asset, so its preview, overlays and signed output stay cached.
+    """
+    # Only needed for drawn signatures, so loaded on first use
+    import numpy as np
+    from PIL import Image
+    
+    ink = image_data[:, :, 3] > 0
+    rows = np.flatnonzero(ink.any(axis=1))
+    if rows.size == 0:
+        return None
+    columns = np.flatnonzero(ink.any(axis=0))
+    strokes = image_data[rows[0]:rows[-1] + 1, columns[0]:columns[-1] + 1]
+    
+    # Luminance with the same weights as PIL's "L" conversion, next to the untouched alpha
+    grey = strokes[:, :, :3].astype(np.uint32) @ np.array([299, 587, 114], dtype=np.uint32) // 1000
+    pixels = np.ascontiguousarray(np.dstack((grey, strokes[:, :, 3])), dtype=np.uint8)
+    
+    digest = hashlib.sha256(f"drawn:{pixels.shape}".encode())
+    digest.update(pixels)
+    digest = digest.hexdigest()
+    
+    asset = st.session_state.get("drawn_signature")
+    if asset is None or asset.digest != digest:
+        asset = SignatureAsset(Image.fromarray(pixels, "LA"), digest)
+        st.session_state.drawn_signature = asset
+    return asset
+
+class DocumentHandle:
+    """Parsed state of an uploaded PDF, kept in the session and reused across reruns"""
+    
+    def __init__(self, data, digest, file_id):
+        self.digest = digest
+        self.file_id = file_id
+        # Spool the upload to disk once and map it read-only: the reader faults pages in as it parses
+        # them, and poppler renders previews from the file instead of writing a temporary copy per page.
+        # The file is deleted when the last reference to the handle (session or signing job) goes away.
+        self._spool = tempfile.NamedTemporaryFile(prefix="upload-", suffix=".pdf")
+        self._spool.write(data)
+        self._spool.flush()
+        self.path = self._spool.name
+        self.source = MappedFile(self._spool)
+        # pypdf readers aren't thread-safe; hold this while a signing job or the script uses the reader
+        self.lock = threading.Lock()
+        self.reader = PdfReader(self.source.view())
+        self.text_index = PageTextIndex(self.reader)
+        self.num_pages = len(self.reader.pages)
+        self.page_sizes = [
+            (float(page.mediabox.width), float(page.mediabox.height))
+            for page in self.reader.pages
+        ]
+
+def get_document(uploaded_file):
+    """Return the session's DocumentHandle for an upload, parsing it only when its content changes"""
+    file_id = getattr(uploaded_file, "file_id", None) or (uploaded_file.name, uploaded_file.size)
+    document = st.session_state.get("pdf_document")
+    
+    # Same upload as the last rerun: nothing to hash or parse
+    if document is not None and document.file_id == file_id:
+        return document
+    
+    data = uploaded_file.getvalue()
+    digest = hashlib.sha256(data).hexdigest()
+    if document is not None and document.digest == digest:
+        # Re-uploaded the same bytes; keep the parsed reader
+        document.file_id = file_id
+        return document
+    
+    document = DocumentHandle(data, digest, file_id)
+    st.session_state.pdf_document = document
+    return document
 
 # Create two columns
 col1, col2 = st.columns([1, 1])
 
 with col1:
     st.header("📄 Upload PDF")
-    uploaded_pdf = st.file_uploader("Choose a PDF file", type="pdf")
+    uploaded_pdfs = st.file_uploader(
+        "Choose PDF files", type="pdf", accept_multiple_files=True,
+        help="Upload several PDFs to sign them all with the same position"
+    )
+    
+    # The first upload is previewed and positioned; in bulk mode its position is applied to every file
+    uploaded_pdf = uploaded_pdfs[0] if uploaded_pdfs else None
+    bulk_mode = len(uploaded_pdfs or []) > 1
+    
+    if bulk_mode:
+        st.caption(f"{len(uploaded_pdfs)} PDFs uploaded. Position the signature on {uploaded_pdf.name}; "
+                   "the same position is used for every file.")
+        st.checkbox(
+            "Scale position to each page size", value=True, key="scale_to_page",
+            help="Move and resize the signature in proportion to each page's size, "
+                 "instead of using the same coordinates on every page"
+        )
     
     # Page selection for multi-page PDFs
     if uploaded_pdf:
-        reader = PdfReader(uploaded_pdf)
-        num_pages = len(reader.pages)
-        uploaded_pdf.seek(0)  # Reset file pointer
+        document = get_document(uploaded_pdf)
+        num_pages = document.num_pages
         
         if num_pages > 1:
             st.subheader("📑 Page Selection")
             st.session_state.selected_page = st.selectbox(
-                "Select page to sign:",
+                "Select page to position the signature on:",
                 options=list(range(1, num_pages + 1)),
                 index=st.session_state.selected_page - 1 if st.session_state.selected_page <= num_pages else 0,
                 format_func=lambda x: f"Page {x} of {num_pages}"
             )
+            st.session_state.pages_to_sign = st.radio(
+                "Pages to sign:",
+                list(PAGE_RULES),
+                index=list(PAGE_RULES).index(st.session_state.pages_to_sign),
+                horizontal=True
+            )
+            if st.session_state.pages_to_sign == "Custom":
+                st.text_input(
+                    "Pages or rule",
+                    key="custom_pages",
+                    placeholder="e.g. 1-3,7 or text:Authorised signature",
+                    help="Comma-separated page numbers and ranges (first, last and open ranges like 3- work too), "
+                         "or text:PHRASE to sign every page containing PHRASE"
+                )
         else:
             st.session_state.selected_page = 1
+            st.session_state.pages_to_sign = "Selected page"
     
     st.header("✍️ Signature")
     signature_method = st.radio("Choose signature method:", ["Upload Image", "Draw Signature"])
     
-    uploaded_signature = None
-    drawn_signature = None
+    # Decoded, trimmed and pre-scaled once per signature content hash
+    signature_asset = None
     
     if signature_method == "Upload Image":
         uploaded_signature = st.file_uploader("Choose your signature image", type=["png", "jpg", "jpeg"])
         
         if uploaded_signature:
-            sig_image = Image.open(uploaded_signature)
-            st.image(sig_image, caption="Your Signature", width=200)
+            signature_asset = load_signature_asset(uploaded_signature)
+            st.image(signature_asset.image, caption="Your Signature", width=200)
     
     else:  # Draw Signature
         st.write("Draw your signature below:")
+        # Only needed on this path, so loaded when the user chooses to draw
+        from streamlit_drawable_canvas import st_canvas
+        
         # Create a canvas component
         canvas_result = st_canvas(
             fill_color="rgba(255, 255, 255, 0)",  # Transparent fill
@@ -166,14 +729,11 @@ with col1:
             key="canvas",
         )
         
-        # Convert canvas to image if there's drawing
+        # Crop and hash the drawing; a blank canvas leaves signature_asset as None
         if canvas_result.image_data is not None:
-            # Check if there's actual drawing (not just blank canvas)
-            if np.any(canvas_result.image_data[:, :, 3] > 0):
-                # Convert to PIL Image
-                drawn_image = Image.fromarray(canvas_result.image_data.astype('uint8'), 'RGBA')
-                drawn_signature = drawn_image
-                st.image(drawn_image, caption="Your Drawn Signature", width=200)
+            signature_asset = drawn_signature_asset(canvas_result.image_data)
+            if signature_asset is not None:
+                st.image(signature_asset.image, caption="Your Drawn Signature", width=200)
         
         if st.button("Clear Signature"):
             st.rerun()
@@ -184,13 +744,13 @@ with col1:
 
 with col2:
     # Check if we have a signature (either uploaded or drawn)
-    has_signature = uploaded_signature is not None or drawn_signature is not None
+    has_signature = signature_asset is not None
     
     if uploaded_pdf and has_signature:
         st.header("📍 Position Your Signature")
         
         # Convert selected page of PDF to image for preview
-        pdf_image = pdf_to_image(uploaded_pdf, st.session_state.selected_page)
+        pdf_image = pdf_to_image(document, st.session_state.selected_page)
         
         if pdf_image:
             # Get image dimensions
@@ -198,71 +758,64 @@ with col2:
             
             # Interactive positioning
             st.subheader("Position Your Signature")
-            st.info("💡 Click on the document preview below to position your signature")
-            
-            # Prepare signature for overlay
-            if uploaded_signature:
-                sig_img = Image.open(uploaded_signature)
-            else:
-                sig_img = drawn_signature
-            sig_img = sig_img.resize((150, 50), Image.Resampling.LANCZOS)
-            
-            # Create the interactive plot with plotly
-            fig = go.Figure()
+            st.info("💡 Drag the signature or click on the page to position it")
             
-            # Convert PIL image to numpy array for plotly
-            img_array = np.array(pdf_image)
-            
-            # Add the PDF page as background
-            fig.add_trace(go.Image(z=img_array))
-            
-            # Add a scatter point for the signature position
-            fig.add_trace(go.Scatter(
-                x=[st.session_state.signature_x + 75],  # Center of signature
-                y=[st.session_state.signature_y + 25],  # Center of signature
-                mode='markers',
-                marker=dict(size=20, color='red', symbol='x'),
-                name='Signature Position',
-                hovertemplate='Click anywhere to move signature here<extra></extra>'
-            ))
-            
-            # Configure the layout
-            fig.update_layout(
-                height=600,
-                xaxis=dict(
-                    range=[0, img_width],
-                    showgrid=False,
-                    zeroline=False,
-                    visible=False
-                ),
-                yaxis=dict(
-                    range=[img_height, 0],  # Invert y-axis for image coordinates
-                    showgrid=False,
-                    zeroline=False,
-                    visible=False,
-                    scaleanchor='x'
-                ),
-                margin=dict(l=0, r=0, t=0, b=0),
-                hovermode='closest',
-                dragmode=False,
-                showlegend=False
+            # Dragging happens in the browser; only the final position comes back
+            page_label = f"Page {st.session_state.selected_page}" if num_pages > 1 else "Preview"
+            position = signature_positioner(
+                page_image=image_data_url(pdf_image, (document.digest, st.session_state.selected_page, PREVIEW_DPI), "JPEG"),
+                signature_image=image_data_url(signature_asset.preview, signature_asset.digest, "PNG"),
+                page_width=img_width,
+                page_height=img_height,
+                sig_width=150,
+                sig_height=50,
+                x=st.session_state.signature_x,
+                y=st.session_state.signature_y,
+                date_text=datetime.now().strftime("%d %m %Y") if st.session_state.add_date else None,
+                key="signature_positioner",
+                default=None,
             )
+            st.caption(f"{page_label} with Signature")
             
-            # Display the interactive plot
-            click_data = st.plotly_chart(fig, use_container_width=True, on_select="rerun", selection_mode="points")
+            # The component keeps returning its last value, so only apply new gestures
+            if position and position.get("nonce") != st.session_state.get("positioner_nonce"):
+                st.session_state.positioner_nonce = position["nonce"]
+                st.session_state.signature_x = max(0, min(int(position["x"]), img_width - 150))
+                st.session_state.signature_y = max(0, min(int(position["y"]), img_height - 50))
             
-            # Handle click events
-            if click_data and 'selection' in click_data and click_data['selection']['points']:
-                # Get the clicked coordinates
-                point = click_data['selection']['points'][0]
-                if 'x' in point and 'y' in point:
-                    # Update signature position (adjust for signature size to center on click)
-                    # Allow positioning anywhere on the document within bounds
-                    new_x = max(0, min(int(point['x']) - 75, img_width - 150))
-                    new_y = max(0, min(int(point['y']) - 25, img_height - 50))
-                    st.session_state.signature_x = new_x
-                    st.session_state.signature_y = new_y
-                    st.rerun()
+            # Auto-placement next to anchor text such as "Signature:"
+            col_anchor, col_place = st.columns([3, 1])
+            with col_anchor:
+                anchor_text = st.text_input(
+                    "Anchor text",
+                    placeholder=", ".join(DEFAULT_ANCHORS),
+                    help="Text to place the signature next to; leave empty to try the defaults",
+                    label_visibility="collapsed"
+                )
+            with col_place:
+                if st.button("🧲 Auto-place", use_container_width=True):
+                    anchors = [anchor_text] if anchor_text.strip() else DEFAULT_ANCHORS
+                    page_index = st.session_state.selected_page - 1
+                    if document.lock.acquire(blocking=False):
+                        try:
+                            anchor_box = anchor_locator.locate(document.reader.pages[page_index], anchors, page_index)
+                        finally:
+                            document.lock.release()
+                    else:
+                        # A signing job holds the session's reader; don't wait for it, read the page separately
+                        with document.source.view() as view:
+                            anchor_box = anchor_locator.locate(PdfReader(view).pages[page_index], anchors, page_index)
+                    if anchor_box is None:
+                        st.warning("No anchor text found on this page")
+                    else:
+                        # Convert the PDF position (bottom-left origin) to preview pixels (top-left origin)
+                        pdf_width, pdf_height = document.page_sizes[st.session_state.selected_page - 1]
+                        anchor_x, anchor_y = anchor_position(anchor_box)
+                        new_x = int(anchor_x * img_width / pdf_width)
+                        new_y = int(img_height - anchor_y * img_height / pdf_height) - 50
+                        st.session_state.signature_x = max(0, min(new_x, img_width - 150))
+                        st.session_state.signature_y = max(0, min(new_y, img_height - 50))
+                        st.rerun()
             
             # Optional: Keep sliders for fine-tuning
             with st.expander("Fine-tune position with sliders"):
@@ -286,99 +839,117 @@ with col2:
                         st.session_state.signature_y = y_pos
                         st.rerun()
             
-            # Show preview with signature
-            st.subheader("Preview with Signature")
-            
-            # Create a copy of the PDF image
-            preview_img = pdf_image.copy()
-            
-            # Overlay signature on preview
-            if uploaded_signature:
-                sig_img = Image.open(uploaded_signature)
-            else:
-                sig_img = drawn_signature
-            sig_img = sig_img.resize((150, 50), Image.Resampling.LANCZOS)
-            
-            # Calculate position for preview
-            preview_x = st.session_state.signature_x
-            preview_y = st.session_state.signature_y
-            
-            # Paste signature on preview
-            if sig_img.mode == 'RGBA':
-                preview_img.paste(sig_img, (preview_x, preview_y), sig_img)
-            else:
-                preview_img.paste(sig_img, (preview_x, preview_y))
-            
-            # Add date text to preview if enabled
-            if st.session_state.add_date:
-                from PIL import ImageDraw, ImageFont
-                draw = ImageDraw.Draw(preview_img)
-                date_text = datetime.now().strftime("%d %m %Y")
-                # Try to use a basic font, fallback to default if not available
-                try:
-                    font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 14)
-                except:
-                    font = ImageFont.load_default()
-                draw.text((preview_x + 65, preview_y + 52), date_text, fill='black', font=font)
-            
-            # Show preview
-            page_label = f"Page {st.session_state.selected_page}" if num_pages > 1 else "Preview"
-            st.image(preview_img, caption=f"{page_label} with Signature", use_container_width=True)
-            
-            
             # Process button
-            if st.button("🎯 Sign PDF", type="primary"):
-                with st.spinner("Processing..."):
-                    # Get PDF page dimensions for the selected page
-                    reader = PdfReader(uploaded_pdf)
-                    page = reader.pages[st.session_state.selected_page - 1]
-                    page_box = page.mediabox
-                    pdf_width = float(page_box.width)
-                    pdf_height = float(page_box.height)
-                    
-                    # Scale coordinates from image to PDF
-                    scale_x = pdf_width / img_width
-                    scale_y = pdf_height / img_height
-                    
-                    # Signature dimensions in preview (pixels) and scaled for PDF
-                    preview_sig_width = 150
-                    preview_sig_height = 50
-                    pdf_sig_width = preview_sig_width * scale_x
-                    pdf_sig_height = preview_sig_height * scale_y
-                    
-                    # Convert coordinates - PDF Y axis is bottom-up, image Y axis is top-down
-                    pdf_x = st.session_state.signature_x * scale_x
-                    # Y position: convert from top-down to bottom-up coordinate system
-                    pdf_y = pdf_height - (st.session_state.signature_y * scale_y) - pdf_sig_height
-                    
-                    # Process the PDF
-                    uploaded_pdf.seek(0)  # Reset file pointer
-                    if uploaded_signature:
-                        sig_image = Image.open(uploaded_signature)
-                    else:
-                        sig_image = drawn_signature
+            sign_label = f"🎯 Sign {len(uploaded_pdfs)} PDFs" if bulk_mode else "🎯 Sign PDF"
+            if st.button(sign_label, type="primary"):
+                # Get PDF page dimensions for the selected page
+                pdf_width, pdf_height = document.page_sizes[st.session_state.selected_page - 1]
+                
+                # Scale coordinates from image to PDF
+                scale_x = pdf_width / img_width
+                scale_y = pdf_height / img_height
+                
+                # Signature dimensions in preview (pixels) and scaled for PDF
+                preview_sig_width = 150
+                preview_sig_height = 50
+                pdf_sig_width = preview_sig_width * scale_x
+                pdf_sig_height = preview_sig_height * scale_y
+                
+                # Convert coordinates - PDF Y axis is bottom-up, image Y axis is top-down
+                pdf_x = st.session_state.signature_x * scale_x
+                # Y position: convert from top-down to bottom-up coordinate system
+                pdf_y = pdf_height - (st.session_state.signature_y * scale_y) - pdf_sig_height
+                
+                # Resolve the page rule chosen in the UI
+                if st.session_state.pages_to_sign == "Custom":
+                    pages_spec = st.session_state.get("custom_pages") or str(st.session_state.selected_page)
+                else:
+                    pages_spec = PAGE_RULES[st.session_state.pages_to_sign]
+                
+                # Everything that affects the output; identical requests are served from the cache
+                add_date = st.session_state.add_date
+                selected_page = st.session_state.selected_page
+                result_key = (
+                    document.digest, signature_asset.digest, round(pdf_x, 2), round(pdf_y, 2),
+                    round(pdf_sig_width, 2), round(pdf_sig_height, 2), pages_spec or str(selected_page),
+                    add_date, datetime.now().strftime("%d %m %Y")
+                )
+                
+                previous_job = st.session_state.get("signing_job")
+                if previous_job is not None and not previous_job.finished:
+                    previous_job.cancel()
+                
+                job = SigningJob(f"{len(uploaded_pdfs)} PDFs" if bulk_mode else uploaded_pdf.name, result_key)
+                signed_cache = get_signed_cache()
+                overlay_cache = get_overlay_cache()
+                bulk_executor = get_bulk_executor()
+                reference_size = (pdf_width, pdf_height) if st.session_state.get("scale_to_page", True) else None
+                
+                def sign_upload(upload):
+                    # Runs on a bulk signing thread; each file gets its own reader
+                    metrics = SigningMetrics(label=upload.name, trace_memory=False)
                     signed_pdf = add_signature_to_pdf(
-                        uploaded_pdf,
-                        sig_image,
+                        io.BytesIO(upload.getvalue()),
+                        signature_asset,
                         (pdf_x, pdf_y),
-                        st.session_state.selected_page,
-                        st.session_state.add_date,
-                        (pdf_sig_width, pdf_sig_height)
-                    )
-                    
-                    # Offer download
-                    st.success("✅ PDF signed successfully!")
-                    
-                    # Get original filename
-                    original_name = uploaded_pdf.name
-                    signed_name = original_name.replace('.pdf', '_signed.pdf')
-                    
-                    st.download_button(
-                        label="📥 Download Signed PDF",
-                        data=signed_pdf.getvalue(),
-                        file_name=signed_name,
-                        mime="application/pdf"
+                        selected_page,
+                        add_date,
+                        (pdf_sig_width, pdf_sig_height),
+                        pages=pages_spec,
+                        metrics=metrics,
+                        progress=job.check_cancelled,
+                        overlay_cache=overlay_cache,
+                        reference_size=reference_size
                     )
+                    return signed_pdf, metrics.pages_signed
+                
+                def sign_bulk_in_background(job):
+                    sign_files_to_zip(job, uploaded_pdfs, sign_upload, bulk_executor)
+                
+                def sign_in_background(job):
+                    # Runs on a signing thread: no Streamlit calls, only the objects captured here.
+                    # tracemalloc is process-wide and other jobs run alongside, so only timings are kept
+                    metrics = SigningMetrics(label=job.label, callback=lambda data: setattr(job, "metrics", data),
+                                             trace_memory=False)
+                    with document.lock:
+                        # Process the PDF, reusing the session's parsed reader and text index
+                        signed_pdf = add_signature_to_pdf(
+                            document.source.view(),
+                            signature_asset,
+                            (pdf_x, pdf_y),
+                            selected_page,
+                            add_date,
+                            (pdf_sig_width, pdf_sig_height),
+                            reader=document.reader,
+                            pages=pages_spec,
+                            text_index=document.text_index,
+                            metrics=metrics,
+                            progress=job.report,
+                            overlay_cache=overlay_cache
+                        )
+                    signed_cache.put(job.result_key, signed_pdf.read())
+                
+                if not bulk_mode and signed_cache.get(result_key) is not None:
+                    job.status = "done"
+                else:
+                    try:
+                        get_signing_queue().submit(job, sign_bulk_in_background if bulk_mode else sign_in_background)
+                    except RuntimeError as e:
+                        job.status = "failed"
+                        job.error = str(e)
+                st.session_state.signing_job = job
+            
+            # Progress of a running job, or the result of the last one
+            signing_job = st.session_state.get("signing_job")
+            if signing_job is not None:
+                if signing_job.finished:
+                    show_signing_result(signing_job)
+                else:
+                    signing_progress()
+            
+            # Timings of the last signing run, kept across reruns
+            if st.session_state.get('last_metrics'):
+                show_diagnostics(st.session_state.last_metrics)
     else:
         st.info("👈 Please upload a PDF file and provide a signature (upload or draw) to begin")
 
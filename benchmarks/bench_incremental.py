@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Incremental Update Benchmark
+Compares bytes written and wall time of the full-rewrite and incremental output paths
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from add_signature import add_signature_to_pdf  # noqa: E402
+from synthetic import make_inputs, make_signature  # noqa: E402
+
+CASES = {
+    'text-10': ('text', 10),
+    'text-2000': ('text', 2000),
+    'scanned-100': ('scanned', 100),
+}
+
+
+def time_case(input_pdf, signature, incremental, repeat):
+    """Return (median seconds, bytes written) for signing input_pdf repeat times"""
+    timings = []
+    with tempfile.TemporaryDirectory() as scratch:
+        output_pdf = os.path.join(scratch, 'signed.pdf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            add_signature_to_pdf(input_pdf, output_pdf, signature, incremental=incremental)
+            timings.append(time.perf_counter() - start)
+        written = os.path.getsize(output_pdf)
+    return statistics.median(timings), written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark full-rewrite vs incremental-update output')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'add_signature_bench'),
+                        help='Directory for generated input PDFs (reused between runs)')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='Runs per case (default: 3)')
+    parser.add_argument('--json', help='Also write results to this JSON file')
+    args = parser.parse_args()
+
+    inputs = make_inputs(args.data_dir, CASES)
+    signature = make_signature(os.path.join(args.data_dir, 'signature.png'))
+
+    results = []
+    print(f"{'case':<14}{'input MB':>10}{'mode':>13}{'written MB':>12}{'seconds':>10}")
+    for name, input_pdf in inputs.items():
+        input_size = os.path.getsize(input_pdf)
+        for mode, incremental in (('rewrite', False), ('incremental', True)):
+            seconds, written = time_case(input_pdf, signature, incremental, args.repeat)
+            # Only the appended update is new output; the prefix is a verbatim copy
+            new_bytes = written - input_size if incremental else written
+            results.append({
+                'case': name,
+                'mode': mode,
+                'input_bytes': input_size,
+                'output_bytes': written,
+                'new_bytes': new_bytes,
+                'seconds': seconds,
+            })
+            print(f"{name:<14}{input_size / 1e6:>10.2f}{mode:>13}{written / 1e6:>12.2f}{seconds:>10.3f}"
+                  f"  (+{new_bytes:,} bytes generated)")
+
+    if args.json:
+        with open(args.json, 'w') as results_file:
+            json.dump(results, results_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Input Memory Benchmark
+Compares peak memory of signing a large scanned PDF read into memory with the memory-mapped input
+
+Peak RSS counts mapped file pages the process has touched; they are clean
+page cache the kernel can drop under pressure, and how many get mapped per
+fault depends on the kernel and on whether the file is already cached. The
+Python heap peak (tracemalloc) counts only bytes actually copied in memory.
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import make_inputs, make_signature  # noqa: E402
+
+OPERATIONS = ('hash', 'incremental', 'rewrite')
+
+
+def _reset_peak_rss():
+    """Reset the kernel's peak RSS counter where Linux allows it"""
+    # ru_maxrss survives fork and exec, so a spawned worker would otherwise report its parent's peak
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+
+
+def _peak_rss():
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+def run_operation(operation, mapped, input_pdf, signature, output_pdf):
+    """Run one operation and return how far it pushed peak RSS and the Python heap above the warmed-up process"""
+    from add_signature import add_signature_to_pdf, load_signature_asset, load_signing_modules
+    from output_cache import file_digest
+
+    load_signing_modules()
+    load_signature_asset(signature)
+    _reset_peak_rss()
+    before = _peak_rss()
+    tracemalloc.start()
+
+    if operation == 'hash':
+        if mapped:
+            from mapped_file import MappedFile
+            with MappedFile(input_pdf) as input_file:
+                file_digest(input_file)
+        else:
+            # As the app hashed an upload: the whole document in memory
+            with open(input_pdf, 'rb') as input_file:
+                file_digest(io.BytesIO(input_file.read()))
+    elif mapped:
+        add_signature_to_pdf(input_pdf, output_pdf, signature, pages='last', incremental=operation == 'incremental')
+    elif operation == 'incremental':
+        # Previously the incremental path read the file through a buffered file object
+        with open(input_pdf, 'rb') as input_file:
+            add_signature_to_pdf(input_file, output_pdf, signature, pages='last', incremental=True)
+    else:
+        # PdfReader(path) reads the whole file into a BytesIO before parsing
+        with open(input_pdf, 'rb') as input_file:
+            add_signature_to_pdf(io.BytesIO(input_file.read()), output_pdf, signature, pages='last')
+
+    heap_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'rss': max(_peak_rss() - before, 0), 'heap': heap_peak}
+
+
+def run_isolated(*args):
+    """Run one operation in a freshly spawned process so its peak RSS isn't shared with other runs"""
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        return pool.apply(run_operation, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare peak memory of buffered and memory-mapped PDF input')
+    parser.add_argument('--pages', type=int, default=400, help='Pages in the scanned test PDF (default: 400)')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'add_signature_bench'),
+                        help='Directory for generated input PDFs (reused between runs)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    name = f'scanned-{args.pages}'
+    input_pdf = make_inputs(args.data_dir, {name: ('scanned', args.pages)})[name]
+    signature = make_signature(os.path.join(args.data_dir, 'signature.png'))
+    input_bytes = os.path.getsize(input_pdf)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        output_pdf = os.path.join(scratch, 'signed.pdf')
+        for operation in OPERATIONS:
+            results[operation] = {
+                mode: run_isolated(operation, mode == 'mapped', input_pdf, signature, output_pdf)
+                for mode in ('buffered', 'mapped')
+            }
+
+    if args.json:
+        print(json.dumps({'input': name, 'input_bytes': input_bytes, 'peak_growth_bytes': results}, indent=2))
+        return
+
+    mb = 1024 * 1024
+    print(f"{name}: {input_bytes / mb:.1f} MB; peak growth per operation (RSS / Python heap)")
+    for operation, modes in results.items():
+        buffered, mapped = modes['buffered'], modes['mapped']
+        print(f"  {operation:<12} buffered {buffered['rss'] / mb:7.1f} / {buffered['heap'] / mb:7.1f} MB"
+              f"   mapped {mapped['rss'] / mb:7.1f} / {mapped['heap'] / mb:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Signed Page Count Benchmark
+Measures output size and write time as more pages of one document are signed
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import make_inputs, make_signature  # noqa: E402
+
+from add_signature import add_signature_to_pdf, get_signature_overlay  # noqa: E402
+
+PAGE_COUNTS = (1, 10, 100, 1000)
+
+
+def sign_with_merge_page(input_pdf, signature, pages):
+    """Sign the first pages with pypdf's merge_page, as the rewrite path did before overlay forms"""
+    from pypdf import PdfReader, PdfWriter
+
+    reader = PdfReader(input_pdf)
+    writer = PdfWriter()
+    for page_num, page in enumerate(reader.pages):
+        if page_num < pages:
+            page_size = (float(page.mediabox.width), float(page.mediabox.height))
+            page.merge_page(get_signature_overlay(signature, '01 01 2026', (400, 100), page_size))
+        writer.add_page(page)
+    output = io.BytesIO()
+    writer.write(output)
+    return output.tell()
+
+
+def measure(mode, input_pdf, signature, pages, image_dpi):
+    """Return (output bytes, seconds) for signing the first pages of input_pdf"""
+    start = time.perf_counter()
+    if mode == 'merge_page':
+        size = sign_with_merge_page(input_pdf, signature, pages)
+    else:
+        output = io.BytesIO()
+        add_signature_to_pdf(input_pdf, output, signature, pages=f'1-{pages}',
+                             incremental=mode == 'incremental', image_dpi=image_dpi)
+        size = output.tell()
+    return size, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure output size and time against the number of signed pages')
+    parser.add_argument('--image-dpi', type=int, default=None,
+                        help='Downsample the signature to this resolution (default: full resolution)')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'add_signature_bench'),
+                        help='Directory for generated input PDFs (reused between runs)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    input_pdf = make_inputs(args.data_dir, {'text-1000': ('text', max(PAGE_COUNTS))})['text-1000']
+    # A large, anti-aliased scribble, closer to a scanned signature than the default test image
+    signature = make_signature(os.path.join(args.data_dir, 'signature-large.png'), size=(1200, 400))
+
+    results = {}
+    for mode in ('merge_page', 'rewrite', 'incremental'):
+        # Warm the overlay cache so the first row doesn't include building the overlay
+        measure(mode, input_pdf, signature, 1, args.image_dpi)
+        results[mode] = {
+            pages: dict(zip(('bytes', 'seconds'), measure(mode, input_pdf, signature, pages, args.image_dpi)))
+            for pages in PAGE_COUNTS
+        }
+
+    if args.json:
+        print(json.dumps({'image_dpi': args.image_dpi, 'results': results}, indent=2))
+        return
+
+    print(f"Signing the first N pages of a {max(PAGE_COUNTS)}-page document"
+          + (f" at {args.image_dpi} dpi" if args.image_dpi else ""))
+    for mode, rows in results.items():
+        first = rows[PAGE_COUNTS[0]]['bytes']
+        for pages, row in rows.items():
+            growth = (row['bytes'] - first) / max(pages - PAGE_COUNTS[0], 1)
+            print(f"  {mode:<12}{pages:>6} pages {row['bytes'] / 1024:10.1f} KB {row['seconds']:8.3f}s"
+                  f"  {growth:8.0f} B/extra page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Signing Service Benchmark
+Compares per-document latency of one-shot CLI runs with jobs sent to a warm daemon
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from signing_service import StdioClient  # noqa: E402
+from synthetic import make_inputs, make_signature  # noqa: E402
+
+
+def time_cli(input_pdf, output_pdf, signature, runs):
+    """Return per-run wall times of signing input_pdf with a fresh CLI process each time"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, os.path.join(ROOT, 'add_signature.py'), input_pdf, '-o', output_pdf, '-s', signature],
+            check=True, stdout=subprocess.DEVNULL,
+        )
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def time_daemon(input_pdf, output_pdf, signature, runs):
+    """Return per-job round-trip times through a warm stdio daemon, and its start-up time"""
+    start = time.perf_counter()
+    with StdioClient(signature, '-j', '1') as client:
+        startup = time.perf_counter() - start
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = client.sign(input_pdf, output=output_pdf)
+            timings.append(time.perf_counter() - start)
+            if not result['ok']:
+                raise RuntimeError(result['error'])
+    return timings, startup
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare CLI and daemon signing latency')
+    parser.add_argument('-n', '--runs', type=int, default=10, help='Documents to sign per mode (default: 10)')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'add_signature_bench'),
+                        help='Directory for generated input PDFs (reused between runs)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    inputs = make_inputs(args.data_dir, {'text-10': ('text', 10)})
+    signature = make_signature(os.path.join(args.data_dir, 'signature.png'))
+
+    with tempfile.TemporaryDirectory() as scratch:
+        output_pdf = os.path.join(scratch, 'signed.pdf')
+        cli = time_cli(inputs['text-10'], output_pdf, signature, args.runs)
+        daemon, startup = time_daemon(inputs['text-10'], output_pdf, signature, args.runs)
+
+    results = {
+        'runs': args.runs,
+        'cli_median_seconds': statistics.median(cli),
+        'daemon_median_seconds': statistics.median(daemon),
+        'daemon_startup_seconds': startup,
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"CLI per document:    {results['cli_median_seconds'] * 1000:8.1f} ms (median of {args.runs})")
+        print(f"Daemon per document: {results['daemon_median_seconds'] * 1000:8.1f} ms (median of {args.runs})")
+        print(f"Daemon start-up:     {startup * 1000:8.1f} ms (paid once)")
+
+
+if __name__ == "__main__":
+    main()
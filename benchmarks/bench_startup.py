@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Cold Start Benchmark
+Measures wall time of fresh add_signature.py processes against the start-up targets
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import make_inputs, make_signature  # noqa: E402
+
+# Median wall-time targets in milliseconds, including interpreter start-up
+TARGETS = {
+    'help': 150,
+    'sign-1-page': 450,
+}
+
+
+def time_command(args, runs):
+    """Return the median wall time in seconds of running add_signature.py with args"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, os.path.join(ROOT, 'add_signature.py'), *args],
+            check=True, stdout=subprocess.DEVNULL,
+        )
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure add_signature.py cold-start time')
+    parser.add_argument('-n', '--runs', type=int, default=7, help='Runs per command (default: 7)')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'add_signature_bench'),
+                        help='Directory for generated input PDFs (reused between runs)')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    inputs = make_inputs(args.data_dir, {'text-1': ('text', 1)})
+    signature = make_signature(os.path.join(args.data_dir, 'signature.png'))
+
+    with tempfile.TemporaryDirectory() as scratch:
+        commands = {
+            'help': ['--help'],
+            'sign-1-page': [inputs['text-1'], '-o', os.path.join(scratch, 'signed.pdf'), '-s', signature],
+        }
+        results = {name: time_command(command, args.runs) * 1000 for name, command in commands.items()}
+
+    missed = [name for name, ms in results.items() if ms > TARGETS[name]]
+    if args.json:
+        print(json.dumps({'milliseconds': results, 'targets': TARGETS, 'missed': missed}, indent=2))
+    else:
+        for name, ms in results.items():
+            status = 'ok' if ms <= TARGETS[name] else 'MISSED'
+            print(f"{name:<12}{ms:8.1f} ms  (target {TARGETS[name]} ms)  {status}")
+    return 1 if missed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Signing Benchmark Suite
+Times overlay generation, merge, write and preview rasterization on synthetic PDFs
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import make_inputs, make_signature  # noqa: E402
+
+CASES = {
+    'text-1': ('text', 1),
+    'text-10': ('text', 10),
+    'text-100': ('text', 100),
+    'text-2000': ('text', 2000),
+    'scanned-50': ('scanned', 50),
+    'mixed-100': ('mixed', 100),
+}
+
+QUICK_CASES = ('text-1', 'text-10', 'text-100', 'mixed-100')
+
+STAGES = ('parse', 'overlay', 'merge', 'write', 'incremental', 'preview')
+
+
+def _timed(function, repeat):
+    """Return the median wall time of calling function repeat times"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def run_case(input_pdf, signature, repeat, preview):
+    """Time each stage of signing every page of input_pdf, in the current process"""
+    # Imported here so the parent process stays small and each case starts cold
+    from pypdf import PdfReader, PdfWriter
+    from add_signature import create_signature_overlay, load_signature_asset
+    from incremental_update import IncrementalUpdate
+    from overlay_forms import OverlayForms
+
+    date_text = datetime.now().strftime("%d %m %Y")
+    position = (400, 100)
+    asset = load_signature_asset(signature)
+
+    def parse():
+        reader = PdfReader(input_pdf)
+        return reader, len(reader.pages)
+
+    reader, page_count = parse()
+    page_sizes = sorted({(float(p.mediabox.width), float(p.mediabox.height)) for p in reader.pages})
+
+    def build_overlays():
+        return {size: create_signature_overlay(asset, date_text, position, size).pages[0] for size in page_sizes}
+
+    overlays = build_overlays()
+
+    def merge():
+        # As add_signature_to_pdf rewrites a document: copy each page and stamp the shared overlay form
+        merge_reader = PdfReader(input_pdf)
+        writer = PdfWriter()
+        stamper = OverlayForms(writer._add_object)
+        for page in merge_reader.pages:
+            page_box = page.mediabox
+            stamper.stamp(writer.add_page(page), overlays[float(page_box.width), float(page_box.height)])
+        return writer
+
+    def write():
+        merged.write(io.BytesIO())
+
+    def incremental():
+        with open(input_pdf, 'rb') as input_file:
+            update_reader = PdfReader(input_file)
+            update = IncrementalUpdate(update_reader)
+            for page_num, page in enumerate(update_reader.pages):
+                page_box = page.mediabox
+                update.merge_overlay(page_num, overlays[float(page_box.width), float(page_box.height)])
+            update.write(input_file, io.BytesIO())
+
+    merged = merge()
+    stages = {
+        'parse': _timed(parse, repeat),
+        'overlay': _timed(build_overlays, repeat),
+        'merge': _timed(merge, repeat),
+        'write': _timed(write, repeat),
+        'incremental': _timed(incremental, repeat),
+    }
+
+    if preview:
+        try:
+            import pdf2image
+            with open(input_pdf, 'rb') as input_file:
+                pdf_bytes = input_file.read()
+            stages['preview'] = _timed(
+                lambda: pdf2image.convert_from_bytes(pdf_bytes, first_page=1, last_page=1, dpi=150), repeat
+            )
+        except Exception as e:
+            # Poppler isn't installed everywhere; record why the stage is missing
+            stages['preview'] = None
+            print(f"  preview skipped: {e}", file=sys.stderr)
+
+    return {
+        'pages': page_count,
+        'page_sizes': len(page_sizes),
+        'input_bytes': os.path.getsize(input_pdf),
+        'stages': {
+            stage: None if seconds is None else {
+                'seconds': seconds,
+                # Overlays are built per page size and previews per page, not per document page
+                'pages_per_second': (
+                    (len(page_sizes) if stage == 'overlay' else 1 if stage == 'preview' else page_count)
+                    / seconds if seconds > 0 else None
+                ),
+            }
+            for stage, seconds in stages.items()
+        },
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        'peak_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024),
+    }
+
+
+def run_case_isolated(input_pdf, signature, repeat, preview):
+    """Run one case in a freshly spawned process so peak RSS belongs to that case alone"""
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        return pool.apply(run_case, (input_pdf, signature, repeat, preview))
+
+
+def compare(results, baseline, threshold):
+    """Print per-stage changes against a baseline run and return the regressions"""
+    regressions = []
+    previous = {case['case']: case for case in baseline['results']}
+    print(f"\nCompared with baseline from {baseline.get('timestamp', 'unknown')}:")
+    for case in results:
+        before = previous.get(case['case'])
+        if before is None:
+            continue
+        for stage in STAGES:
+            now, then = case['stages'].get(stage), before['stages'].get(stage)
+            if not now or not then:
+                continue
+            change = now['seconds'] / then['seconds'] - 1 if then['seconds'] > 0 else 0.0
+            marker = '  REGRESSION' if change > threshold else ''
+            print(f"  {case['case']:<12}{stage:<13}{then['seconds']:>10.4f}s -> {now['seconds']:>10.4f}s"
+                  f"  {change:+7.1%}{marker}")
+            if change > threshold:
+                regressions.append((case['case'], stage, change))
+    return regressions
+
+
+def print_results(results):
+    print(f"{'case':<12}{'pages':>6}{'stage':>13}{'seconds':>11}{'pages/s':>12}{'peak RSS MB':>13}")
+    for case in results:
+        for stage in STAGES:
+            timing = case['stages'].get(stage)
+            if stage not in case['stages']:
+                continue
+            if timing is None:
+                print(f"{case['case']:<12}{case['pages']:>6}{stage:>13}{'skipped':>11}")
+                continue
+            rate = timing['pages_per_second']
+            print(f"{case['case']:<12}{case['pages']:>6}{stage:>13}{timing['seconds']:>11.4f}"
+                  f"{rate if rate is not None else 0:>12.1f}{case['peak_rss_bytes'] / 1e6:>13.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the signing and preview hot paths')
+    parser.add_argument('--cases', help=f"Comma-separated cases to run (default: all of {', '.join(CASES)})")
+    parser.add_argument('--quick', action='store_true', help=f"Only run {', '.join(QUICK_CASES)}")
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='Runs per stage; the median is reported (default: 3)')
+    parser.add_argument('--no-preview', action='store_true', help='Skip preview rasterization (needs poppler)')
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'add_signature_bench'),
+                        help='Directory for generated input PDFs (reused between runs)')
+    parser.add_argument('-o', '--output', help='Write results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results from an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Slowdown counted as a regression when comparing (default: 0.10 = 10%%)')
+    args = parser.parse_args()
+
+    names = QUICK_CASES if args.quick else tuple(CASES)
+    if args.cases:
+        names = tuple(name.strip() for name in args.cases.split(','))
+        unknown = [name for name in names if name not in CASES]
+        if unknown:
+            parser.error(f"unknown cases: {', '.join(unknown)}")
+
+    inputs = make_inputs(args.data_dir, {name: CASES[name] for name in names})
+    signature = make_signature(os.path.join(args.data_dir, 'signature.png'))
+
+    results = []
+    for name in names:
+        print(f"Running {name}...", file=sys.stderr)
+        case = run_case_isolated(inputs[name], signature, args.repeat, not args.no_preview)
+        case['case'] = name
+        results.append(case)
+
+    print_results(results)
+
+    import pypdf
+    import reportlab
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pypdf': pypdf.__version__,
+        'reportlab': reportlab.Version,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) slower than the baseline by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
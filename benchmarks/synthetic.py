@@ -0,0 +1,79 @@
+"""
+Synthetic Benchmark Inputs
+Generates PDFs and signature images locally with ReportLab and Pillow
+"""
+
+import io
+import os
+import random
+
+from PIL import Image, ImageDraw
+from reportlab.lib.pagesizes import A4, letter
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+
+def make_signature(path, size=(300, 100)):
+    """Write a transparent PNG with a scribbled signature"""
+    image = Image.new('RGBA', size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(image)
+    width, height = size
+    points = [(int(width * x), int(height * y)) for x, y in
+              [(0.05, 0.8), (0.2, 0.2), (0.35, 0.85), (0.5, 0.3), (0.7, 0.9), (0.95, 0.1)]]
+    draw.line(points, fill=(0, 0, 128, 255), width=4)
+    image.save(path, 'PNG')
+    return path
+
+
+def make_text_pdf(path, pages, page_sizes=(letter,)):
+    """Write a text-only invoice-like PDF, cycling through page_sizes"""
+    c = canvas.Canvas(path)
+    for page_num in range(pages):
+        width, height = page_sizes[page_num % len(page_sizes)]
+        c.setPageSize((width, height))
+        c.setFont("Helvetica", 11)
+        c.drawString(72, height - 72, f"INVOICE 2025-{page_num:05d}")
+        for line in range(30):
+            c.drawString(72, height - 110 - line * 16, f"Item {line:02d}  Widget service charge  {line * 13.5:10.2f}")
+        c.drawString(72, 120, "Authorised signature:")
+        c.showPage()
+    c.save()
+    return path
+
+
+def make_scanned_pdf(path, pages, image_size=(620, 877), seed=0):
+    """Write a PDF whose pages are full-page noisy greyscale images, like a scan"""
+    rng = random.Random(seed)
+    c = canvas.Canvas(path, pagesize=A4)
+    width, height = A4
+    for page_num in range(pages):
+        # Random bytes compress poorly, which keeps the file size close to a real scan
+        image = Image.frombytes('L', image_size, rng.randbytes(image_size[0] * image_size[1]))
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=60)
+        buffer.seek(0)
+        c.drawImage(ImageReader(buffer), 0, 0, width=width, height=height)
+        c.showPage()
+    c.save()
+    return path
+
+
+def make_inputs(directory, cases):
+    """Generate each named case once, returning {name: path}
+
+    cases maps a name to a (kind, pages) tuple, where kind is 'text',
+    'mixed' (alternating letter and A4 pages) or 'scanned'.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for name, (kind, pages) in cases.items():
+        path = os.path.join(directory, f"{name}.pdf")
+        if not os.path.exists(path):
+            if kind == 'scanned':
+                make_scanned_pdf(path, pages)
+            elif kind == 'mixed':
+                make_text_pdf(path, pages, page_sizes=(letter, A4))
+            else:
+                make_text_pdf(path, pages)
+        paths[name] = path
+    return paths
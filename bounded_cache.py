@@ -0,0 +1,71 @@
+"""
+Bounded Cache
+Thread-safe least-recently-used mapping bounded by entry count or by a size budget
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class BoundedCache:
+    """A thread-safe LRU mapping that evicts the least recently used entries past max_size
+
+    Each entry counts as sizeof(value) towards max_size, or as one entry when
+    sizeof is None, so the limit is either an entry count or a budget such as
+    bytes. The newest entry is always kept, even if it alone is over the
+    budget. get() counts hits and misses.
+    """
+
+    def __init__(self, max_size, sizeof=None):
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._sizeof = sizeof
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the value for key and mark it recently used, or default on a miss"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def put(self, key, value):
+        """Store value under key, replacing any previous value, and evict past max_size"""
+        size = 1 if self._sizeof is None else self._sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            # Evict least recently used entries, but always keep the newest one
+            while self.size > self.max_size and len(self._entries) > 1:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return hit/miss counters, the number of entries and their total size"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries),
+                    'size': self.size, 'max_size': self.max_size}
@@ -0,0 +1,269 @@
+"""
+Incremental PDF Updates
+Appends signature overlays to an existing PDF without rewriting the original bytes
+"""
+
+import io
+import os
+import re
+import secrets
+import stat
+import tempfile
+from contextlib import contextmanager
+
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+)
+
+from overlay_forms import OverlayForms
+
+# Size of the blocks used to copy the original document
+COPY_CHUNK_SIZE = 1024 * 1024
+
+_STARTXREF = re.compile(rb"startxref\s+(\d+)")
+
+
+def _original_layout(source):
+    """Return (size, startxref offset, uses xref stream) for the original PDF"""
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+
+    # The last startxref keyword sits within the final few hundred bytes
+    tail_start = max(0, size - 4096)
+    source.seek(tail_start)
+    matches = list(_STARTXREF.finditer(source.read()))
+    if not matches:
+        raise ValueError("startxref not found; cannot append an incremental update")
+    startxref = int(matches[-1].group(1))
+
+    source.seek(startxref)
+    uses_xref_stream = not source.read(32).lstrip().startswith(b"xref")
+    return size, startxref, uses_xref_stream
+
+
+@contextmanager
+def open_output(path):
+    """Open a binary file that replaces path once the block completes
+
+    The data is written to a temporary file in the same directory and moved
+    over path with os.replace, so path may be the very file being read: the
+    original stays intact, including for open descriptors and memory maps,
+    until the new file is complete. An existing path keeps its permissions;
+    if the block fails the temporary file is removed and path is untouched.
+    """
+    # Resolve symlinks so the link keeps pointing at the replaced file
+    path = os.path.realpath(path)
+    directory, name = os.path.split(path)
+    temp_path = os.path.join(directory, f".{name}.{secrets.token_hex(4)}.tmp")
+    # Created like open(path, "wb") would be: 0o666 less the umask
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+    try:
+        with os.fdopen(fd, "wb") as output_file:
+            yield output_file
+        try:
+            os.chmod(temp_path, stat.S_IMODE(os.stat(path).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _os_fileno(stream):
+    """Return the OS file descriptor behind stream, or None for in-memory streams"""
+    # Asking a spooled file for its descriptor would force it onto disk
+    if isinstance(stream, tempfile.SpooledTemporaryFile):
+        return None
+    try:
+        return stream.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+def _copy_in_kernel(source_fd, output_fd, size):
+    """Copy size bytes between descriptors without passing them through Python
+
+    Uses copy_file_range (which can share extents on reflink filesystems) and
+    falls back to sendfile. Returns the number of bytes copied, which is less
+    than size if neither call is available or the filesystem refuses.
+    """
+    copied = 0
+    for copy in (getattr(os, "copy_file_range", None), getattr(os, "sendfile", None)):
+        if copy is None:
+            continue
+        try:
+            while copied < size:
+                if copy is os.sendfile:
+                    count = copy(output_fd, source_fd, copied, size - copied)
+                else:
+                    count = copy(source_fd, output_fd, size - copied, copied)
+                if count == 0:
+                    break
+                copied += count
+        except OSError:
+            # Unsupported for this pair of files; try the next method
+            continue
+        if copied == size:
+            break
+    return copied
+
+
+def copy_original(source, output, size):
+    """Copy the first size bytes of source to output
+
+    When both ends are real files the copy is done in the kernel; otherwise
+    the bytes are streamed through in fixed-size chunks.
+    """
+    copied = 0
+    source_fd = _os_fileno(source)
+    output_fd = _os_fileno(output)
+    if source_fd is not None and output_fd is not None:
+        output.flush()
+        start = os.lseek(output_fd, 0, os.SEEK_CUR)
+        copied = _copy_in_kernel(source_fd, output_fd, size)
+        # Keep the file object's position in step with the descriptor
+        output.seek(start + copied)
+
+    source.seek(copied)
+    remaining = size - copied
+    while remaining:
+        chunk = source.read(min(COPY_CHUNK_SIZE, remaining))
+        if not chunk:
+            raise ValueError("source PDF ended before the expected size")
+        output.write(chunk)
+        remaining -= len(chunk)
+    return size
+
+
+class IncrementalUpdate:
+    """Collects signed page objects and writes them as a PDF incremental update
+
+    The original document is copied byte for byte and followed by the new
+    objects, a cross-reference section and a trailer pointing back at the
+    original one. Only the pages that receive an overlay are read and
+    rewritten, so the cost grows with the signature rather than the document.
+    """
+
+    def __init__(self, reader):
+        if reader.is_encrypted:
+            raise ValueError("incremental updates of encrypted PDFs are not supported")
+        self.reader = reader
+        self._next_number = int(reader.trailer["/Size"])
+        self._objects = {}
+        self._overlays = OverlayForms(self.add_object)
+        self._pages = {}
+
+    def add_object(self, obj):
+        """Register a new object and return an indirect reference to it"""
+        reference = IndirectObject(self._next_number, 0, self.reader)
+        self._next_number += 1
+        self._objects[(reference.idnum, 0)] = obj
+        return reference
+
+    def merge_overlay(self, page_index, overlay_page):
+        """Draw overlay_page on top of the page at page_index"""
+        page = self.reader.pages[page_index]
+        reference = page.indirect_reference
+
+        if page_index in self._pages:
+            new_page = self._pages[page_index][1]
+        else:
+            # Shallow copy keeps references to the original page's objects
+            new_page = DictionaryObject(dict.items(page))
+            self._pages[page_index] = (reference, new_page)
+        self._overlays.stamp(new_page, overlay_page)
+
+    def _write_object(self, buffer, number, generation, obj):
+        buffer.write(f"{number} {generation} obj\n".encode())
+        obj.write_to_stream(buffer)
+        buffer.write(b"\nendobj\n")
+
+    def _trailer_entries(self, size, startxref):
+        trailer = DictionaryObject()
+        trailer[NameObject("/Size")] = NumberObject(size)
+        for key in ("/Root", "/Info", "/ID"):
+            value = dict.get(self.reader.trailer, key)
+            if value is not None:
+                trailer[NameObject(key)] = value
+        trailer[NameObject("/Prev")] = NumberObject(startxref)
+        return trailer
+
+    def write(self, source, output):
+        """Write the original bytes of source followed by the update to output
+
+        source must be the seekable binary stream the reader was opened on;
+        output may be a path or a writable binary file object. Returns the
+        total number of bytes written.
+        """
+        if isinstance(output, (str, os.PathLike)):
+            with open_output(output) as output_file:
+                return self.write(source, output_file)
+
+        size, startxref, uses_xref_stream = _original_layout(source)
+        written = copy_original(source, output, size)
+
+        # The update itself is small, so build it in memory to track offsets
+        buffer = io.BytesIO()
+        buffer.write(b"\n")
+        offsets = {}
+        entries = [(number, generation, obj) for (number, generation), obj in self._objects.items()]
+        entries += [(ref.idnum, ref.generation, page) for ref, page in self._pages.values()]
+        for number, generation, obj in sorted(entries, key=lambda entry: entry[0]):
+            offsets[number] = (written + buffer.tell(), generation)
+            self._write_object(buffer, number, generation, obj)
+
+        xref_offset = written + buffer.tell()
+        if uses_xref_stream:
+            # Files that use cross-reference streams must be updated with one too
+            number = self._next_number
+            offsets[number] = (xref_offset, 0)
+            width = max(4, (xref_offset.bit_length() + 7) // 8)
+            rows = b"".join(
+                b"\x01" + offset.to_bytes(width, "big") + generation.to_bytes(2, "big")
+                for _, (offset, generation) in sorted(offsets.items())
+            )
+            xref = DecodedStreamObject()
+            xref.set_data(rows)
+            xref = xref.flate_encode()
+            xref.update(self._trailer_entries(number + 1, startxref))
+            xref[NameObject("/Type")] = NameObject("/XRef")
+            xref[NameObject("/W")] = ArrayObject(NumberObject(v) for v in (1, width, 2))
+            xref[NameObject("/Index")] = ArrayObject(
+                NumberObject(v) for start, count in _subsections(offsets) for v in (start, count)
+            )
+            self._write_object(buffer, number, 0, xref)
+        else:
+            # Start with the free-list head so readers don't mistake the section for a misnumbered one
+            buffer.write(b"xref\n0 1\n0000000000 65535 f\r\n")
+            for start, count in _subsections(offsets):
+                buffer.write(f"{start} {count}\n".encode())
+                for number in range(start, start + count):
+                    offset, generation = offsets[number]
+                    buffer.write(f"{offset:010d} {generation:05d} n\r\n".encode())
+            buffer.write(b"trailer\n")
+            self._trailer_entries(self._next_number, startxref).write_to_stream(buffer)
+            buffer.write(b"\n")
+        buffer.write(f"startxref\n{xref_offset}\n%%EOF\n".encode())
+
+        output.write(buffer.getvalue())
+        return written + buffer.tell()
+
+
+def _subsections(offsets):
+    """Group object numbers into (first, count) runs of consecutive numbers"""
+    runs = []
+    for number in sorted(offsets):
+        if runs and runs[-1][0] + runs[-1][1] == number:
+            runs[-1][1] += 1
+        else:
+            runs.append([number, 1])
+    return [tuple(run) for run in runs]
@@ -0,0 +1,177 @@
+"""
+Signing Instrumentation
+Per-stage timing and memory statistics for the signing pipeline
+"""
+
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Set to any non-empty value other than "0" to log one JSON line per signed document
+METRICS_ENV_VAR = "ADD_SIGNATURE_METRICS"
+
+STAGES = ("parse", "select", "overlay", "merge", "write")
+
+logger = logging.getLogger("add_signature.metrics")
+
+
+def metrics_enabled():
+    """Return True if the environment asks for a metrics log line per document"""
+    return os.environ.get(METRICS_ENV_VAR, "") not in ("", "0")
+
+
+def stream_size(stream):
+    """Return the size in bytes of a path or seekable file object, or None"""
+    if isinstance(stream, (str, os.PathLike)):
+        return os.path.getsize(stream) if os.path.exists(stream) else None
+    try:
+        position = stream.tell()
+        size = stream.seek(0, os.SEEK_END)
+        stream.seek(position)
+        return size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class SigningMetrics:
+    """Collects per-stage durations, byte counts and peak memory for one document
+
+    Use it as a context manager around add_signature_to_pdf and pass it in:
+
+        with SigningMetrics(callback=print) as metrics:
+            add_signature_to_pdf(..., metrics=metrics)
+
+    Stages nest: time spent building an overlay while merging is counted
+    under "overlay" only. When the outermost block exits, callback (if any)
+    is called with as_dict() and, if ADD_SIGNATURE_METRICS is set, the same
+    data is logged as a single JSON line. Memory is traced with tracemalloc,
+    which slows Python allocations noticeably, so pass trace_memory=False for
+    timing-only runs.
+    """
+
+    def __init__(self, label=None, callback=None, trace_memory=True):
+        self.label = label
+        self.callback = callback
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.bytes_in = None
+        self.bytes_out = None
+        self.pages = None
+        self.pages_signed = None
+        self.peak_memory = None
+        self.total = None
+        self.error = None
+        self._depth = 0
+        self._stack = []
+        self._started = None
+        self._owns_tracing = False
+
+    def __enter__(self):
+        self._depth += 1
+        if self._depth == 1:
+            if self.trace_memory:
+                self._owns_tracing = not tracemalloc.is_tracing()
+                if self._owns_tracing:
+                    tracemalloc.start()
+                else:
+                    tracemalloc.reset_peak()
+            self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self._depth -= 1
+        if exc is not None and self.error is None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        if self._depth == 0:
+            self.total = time.perf_counter() - self._started
+            if self.trace_memory:
+                self.peak_memory = tracemalloc.get_traced_memory()[1]
+                if self._owns_tracing:
+                    tracemalloc.stop()
+            self._finish()
+        return False
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block of work as stage name, excluding any stages nested inside it"""
+        entry = [name, time.perf_counter(), 0.0]
+        self._stack.append(entry)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            elapsed = time.perf_counter() - entry[1]
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed - entry[2]
+            if self._stack:
+                self._stack[-1][2] += elapsed
+
+    def as_dict(self):
+        """Return the collected metrics as a JSON-serializable dict"""
+        return {
+            "label": self.label,
+            "pages": self.pages,
+            "pages_signed": self.pages_signed,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "seconds": {name: round(self.stages[name], 6) for name in self.stages},
+            "total_seconds": None if self.total is None else round(self.total, 6),
+            "tracemalloc_peak_bytes": self.peak_memory,
+            "error": self.error,
+        }
+
+    def _finish(self):
+        data = self.as_dict()
+        if self.callback is not None:
+            self.callback(data)
+        if metrics_enabled():
+            log_metrics(data)
+
+
+class NullMetrics:
+    """Stand-in used when instrumentation is off; every operation is a no-op"""
+
+    label = bytes_in = bytes_out = pages = pages_signed = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    def __setattr__(self, name, value):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+def resolve_metrics(metrics, label=None):
+    """Return metrics, a fresh SigningMetrics if the environment enables logging, or a no-op"""
+    if metrics is not None:
+        if metrics.label is None:
+            metrics.label = label
+        return metrics
+    if metrics_enabled():
+        return SigningMetrics(label=label)
+    return NULL_METRICS
+
+
+def log_metrics(data):
+    """Write one metrics dict as a JSON log line"""
+    if logger.level == logging.NOTSET:
+        # The environment variable is the opt-in, so don't let a WARNING root level drop the line
+        logger.setLevel(logging.INFO)
+    if not logger.handlers and not logging.getLogger().handlers:
+        # Nothing configured logging; make sure the line still reaches stderr
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    logger.info(json.dumps({"event": "signing_metrics", **data}, default=str))
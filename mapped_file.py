@@ -0,0 +1,96 @@
+"""
+Mapped File Input
+Read-only, memory-mapped PDF input shared by the reader, the hasher and the byte copier
+"""
+
+import io
+import mmap
+import os
+
+
+class MappedFile(io.RawIOBase):
+    """A seekable read-only stream over a memory-mapped file
+
+    Opening a path with pypdf's PdfReader reads the whole file into memory
+    first; reading through a MappedFile instead lets the kernel fault pages
+    in as the parser touches them, so a large scanned PDF costs only the
+    pages actually read. getbuffer() exposes the mapping as a memoryview for
+    zero-copy hashing, and fileno() is the underlying descriptor, so the
+    incremental writer can still copy the original bytes in the kernel.
+
+    view() maps the same file again as another stream with its own
+    position, for readers on other threads; the pages themselves are shared
+    through the page cache.
+    """
+
+    def __init__(self, source):
+        super().__init__()
+        # A file object passed in stays open; its owner closes it
+        self._owns_file = isinstance(source, (str, os.PathLike))
+        self._file = open(source, 'rb') if self._owns_file else source
+        size = os.fstat(self._file.fileno()).st_size
+        # mmap can't map an empty file; an empty buffer reads the same
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else io.BytesIO()
+        # pypdf makes many tiny reads, so serve them from the map's own C methods
+        self.read = self._map.read
+        self.tell = self._map.tell
+        self.name = getattr(self._file, 'name', source)
+
+    def view(self):
+        """Return an independent stream over the same file; close it separately"""
+        return MappedFile(self._file)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def fileno(self):
+        return self._file.fileno()
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        self._map.seek(offset, whence)
+        return self._map.tell()
+
+    def readall(self):
+        return self._map.read()
+
+    def readinto(self, buffer):
+        data = self._map.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def getbuffer(self):
+        """Return the whole file as a read-only memoryview; release it before close()"""
+        return self._map.getbuffer() if isinstance(self._map, io.BytesIO) else memoryview(self._map)
+
+    def release(self, start, length):
+        """Drop the pages of a byte range from this process's memory once they have been read
+
+        The data stays in the page cache and is faulted back in if touched
+        again. A no-op where madvise isn't available.
+        """
+        if not hasattr(self._map, 'madvise'):
+            return
+        aligned = start - start % mmap.PAGESIZE
+        length = min(start + length, len(self._map)) - aligned
+        if length > 0:
+            self._map.madvise(mmap.MADV_DONTNEED, aligned, length)
+
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        try:
+            self._map.close()
+        except BufferError:
+            # A getbuffer() view is still alive; the mapping goes when it does
+            pass
+        if self._owns_file:
+            self._file.close()
+
+    def __del__(self):
+        # IOBase would close() here, cutting off a read bound to the map that outlives this object;
+        # the map and file close themselves once nothing references them
+        pass
@@ -0,0 +1,213 @@
+"""
+Signed Output Cache
+Content-addressed on-disk cache of signed PDFs, shared safely between worker processes
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from incremental_update import open_output
+
+# Bump when a code change alters the signed output, so old entries stop matching
+CACHE_FORMAT = 2
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Puts between full rescans, which pick up entries written by other processes
+RESCAN_INTERVAL = 500
+
+# Eviction frees space down to this fraction of max_bytes, so the next puts don't evict again
+EVICT_TARGET = 0.9
+
+# Temporary files older than this are left over from a crashed writer
+STALE_TEMP_SECONDS = 3600
+
+_TEMP_PREFIX = ".tmp-"
+
+
+def file_digest(source, chunk_size=HASH_CHUNK_SIZE):
+    """Return the SHA-256 of a path or binary file object, reading it in chunks
+
+    A file object is hashed from the start and left at its original position.
+    Sources with getbuffer() (io.BytesIO, mapped_file.MappedFile) are hashed
+    in place without copying; mapped pages are released as they are hashed,
+    so hashing a large file doesn't leave all of it resident.
+    """
+    digest = hashlib.sha256()
+    if hasattr(source, "getbuffer"):
+        release = getattr(source, "release", None)
+        with source.getbuffer() as buffer:
+            for start in range(0, len(buffer), chunk_size):
+                digest.update(buffer[start:start + chunk_size])
+                if release is not None:
+                    release(start, chunk_size)
+        return digest.hexdigest()
+
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as source_file:
+            for chunk in iter(lambda: source_file.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    position = source.tell()
+    source.seek(0)
+    try:
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            digest.update(chunk)
+    finally:
+        source.seek(position)
+    return digest.hexdigest()
+
+
+class OutputCache:
+    """Signed PDFs stored under a hash of everything that determines their bytes
+
+    Entries live in two-level fan-out directories as ``<key>-<pages>.pdf``,
+    so the page count comes back with a hit without parsing the PDF. Writers
+    fill a temporary file in the cache directory and publish it with
+    os.replace, so readers (including other processes) see either nothing or
+    a complete file. Hits refresh the entry's modification time, and when the
+    total size passes max_bytes the least recently used entries are removed.
+
+    Scanning the cache costs a stat per entry, so the total size is kept as
+    a running estimate: the cache is scanned on the first put, each put adds
+    its own entry, and a full rescan happens only when the estimate passes
+    max_bytes or every RESCAN_INTERVAL puts, to count entries added by other
+    processes sharing the directory.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = os.fspath(directory)
+        self.max_bytes = max_bytes
+        self._size_estimate = None
+        self._puts_since_scan = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(input_digest, signature_digest, **options):
+        """Return the cache key for an input, a signature and the signing options"""
+        material = json.dumps(
+            {"format": CACHE_FORMAT, "input": input_digest, "signature": signature_digest, "options": options},
+            sort_keys=True, default=list,
+        )
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def _folder(self, key):
+        return os.path.join(self.directory, key[:2])
+
+    def _find(self, key):
+        """Return (path, pages) for a cached key, or (None, None)"""
+        try:
+            names = os.listdir(self._folder(key))
+        except FileNotFoundError:
+            return None, None
+        for name in names:
+            stem, _, pages = name[:-len(".pdf")].rpartition("-")
+            if stem == key and name.endswith(".pdf"):
+                return os.path.join(self._folder(key), name), int(pages)
+        return None, None
+
+    def get(self, key, output):
+        """Copy the cached PDF for key to output (a path or binary file object)
+
+        Returns the page count stored with the entry, or None on a miss.
+        """
+        path, pages = self._find(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as cached:
+                if isinstance(output, (str, os.PathLike)):
+                    # Replaced atomically, like every other path output, so output may be the input
+                    with open_output(output) as output_file:
+                        shutil.copyfileobj(cached, output_file)
+                else:
+                    shutil.copyfileobj(cached, output)
+            # Mark as recently used for eviction
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another process between finding and opening it
+            return None
+        return pages
+
+    def put(self, key, source, pages):
+        """Store the signed PDF in source (a path, or a file object read to EOF) under key"""
+        folder = self._folder(key)
+        os.makedirs(folder, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=_TEMP_PREFIX, dir=folder)
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                if isinstance(source, (str, os.PathLike)):
+                    with open(source, "rb") as source_file:
+                        shutil.copyfileobj(source_file, temp_file)
+                else:
+                    shutil.copyfileobj(source, temp_file)
+            size = os.path.getsize(temp_path)
+            os.replace(temp_path, os.path.join(folder, f"{key}-{int(pages)}.pdf"))
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        self._puts_since_scan += 1
+        if self._size_estimate is None or self._puts_since_scan >= RESCAN_INTERVAL:
+            self.evict()
+        else:
+            self._size_estimate += size
+            if self._size_estimate > self.max_bytes:
+                self.evict()
+
+    def _entries(self):
+        """Yield (mtime, size, path) for every cache entry, removing stale temporary files"""
+        now = time.time()
+        for folder in os.scandir(self.directory):
+            if not folder.is_dir():
+                continue
+            for entry in os.scandir(folder.path):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.startswith(_TEMP_PREFIX):
+                    if now - stat.st_mtime > STALE_TEMP_SECONDS:
+                        self._remove(entry.path)
+                    continue
+                yield stat.st_mtime, stat.st_size, entry.path
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            # Another process got there first
+            pass
+
+    def evict(self):
+        """Scan the cache and, if it is over max_bytes, remove least recently used entries
+
+        Entries are removed until the cache is back under EVICT_TARGET of
+        max_bytes, leaving room for the next puts.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_bytes:
+            for _, size, path in entries:
+                if total <= self.max_bytes * EVICT_TARGET:
+                    break
+                self._remove(path)
+                total -= size
+        self._size_estimate = total
+        self._puts_since_scan = 0
+
+    def stats(self):
+        """Return the number of entries and their total size"""
+        entries = list(self._entries())
+        return {"entries": len(entries), "bytes": sum(size for _, size, _ in entries), "max_bytes": self.max_bytes}
@@ -0,0 +1,181 @@
+"""
+Overlay Forms
+Stamps signature overlays as shared Form XObjects, registering their images and fonts once per output document
+"""
+
+import base64
+import hashlib
+import io
+
+from pypdf.generic import (
+    ArrayObject,
+    DecodedStreamObject,
+    DictionaryObject,
+    EncodedStreamObject,
+    FloatObject,
+    IndirectObject,
+    NameObject,
+    StreamObject,
+)
+
+
+def _strip_ascii85(stream):
+    """Drop a leading ASCII85 filter from an encoded stream copy, leaving the binary data under it"""
+    filters = stream.get("/Filter")
+    if not isinstance(filters, ArrayObject) or len(filters) < 2 or filters[0] != "/ASCII85Decode":
+        return
+    data = stream._data.strip()
+    if data.endswith(b"~>"):
+        data = data[:-2]
+    stream._data = base64.a85decode(data)
+    remaining = ArrayObject(filters[1:])
+    stream[NameObject("/Filter")] = remaining[0] if len(remaining) == 1 else remaining
+    parms = stream.get("/DecodeParms")
+    if isinstance(parms, ArrayObject):
+        parms = ArrayObject(parms[1:])
+        stream[NameObject("/DecodeParms")] = parms[0] if len(parms) == 1 else parms
+
+
+class OverlayForms:
+    """Overlay pages turned into Form XObjects and stamped onto the pages of one output document
+
+    add_object registers a new object in the output and returns a reference
+    to it (PdfWriter._add_object, or IncrementalUpdate.add_object). Each
+    overlay page becomes a single Form XObject however many pages it is
+    stamped on, and the images, soft masks and fonts inside the overlays are
+    registered once per distinct content, so overlays built for different
+    positions or page sizes still share one copy of the signature image and
+    of Helvetica. Stamping leaves the page's own content streams untouched:
+    it only adds the form to the page resources and wraps the content in
+    shared q / Q Do streams.
+
+    ReportLab encodes images as ASCII85 over Flate; imported streams keep
+    the Flate data and lose the ASCII85 layer, which is about a fifth of
+    their size.
+    """
+
+    def __init__(self, add_object):
+        self.add_object = add_object
+        self._imported = {}
+        self._by_digest = {}
+        self._sources = []
+        self._forms = {}
+        self._begin_stream = None
+        self._end_streams = {}
+
+    def import_object(self, obj):
+        """Copy an object from an overlay PDF, adding each distinct indirect object to the output once
+
+        Overlay resources (images, soft masks, fonts) don't reference back
+        to their pages, so the object graph being copied has no cycles.
+        """
+        if isinstance(obj, IndirectObject):
+            key = (id(obj.pdf), obj.idnum, obj.generation)
+            if key not in self._imported:
+                # Keep the source alive so its id() can't be reused while this output is built
+                self._sources.append(obj.pdf)
+                copy = self.import_object(obj.get_object())
+                # Children are already imported, so equal content serializes to equal bytes
+                serialized = io.BytesIO()
+                copy.write_to_stream(serialized)
+                digest = hashlib.sha256(serialized.getvalue()).digest()
+                if digest not in self._by_digest:
+                    self._by_digest[digest] = self.add_object(copy)
+                self._imported[key] = self._by_digest[digest]
+            return self._imported[key]
+
+        if isinstance(obj, StreamObject):
+            copy = obj.__class__()
+            copy._data = obj._data
+            for key, value in dict.items(obj):
+                copy[key] = self.import_object(value)
+            if isinstance(copy, EncodedStreamObject):
+                _strip_ascii85(copy)
+            return copy
+
+        if isinstance(obj, DictionaryObject):
+            copy = DictionaryObject()
+            for key, value in dict.items(obj):
+                copy[key] = self.import_object(value)
+            return copy
+
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self.import_object(value) for value in obj)
+
+        return obj
+
+    def form(self, overlay_page):
+        """Return a Form XObject wrapping the overlay page, creating it once per overlay"""
+        if id(overlay_page) in self._forms:
+            return self._forms[id(overlay_page)][1]
+
+        contents = overlay_page["/Contents"]
+        if isinstance(contents, StreamObject) and "/Filter" in contents:
+            # Reuse the already-encoded content stream as is
+            form = EncodedStreamObject()
+            form._data = contents._data
+            form[NameObject("/Filter")] = contents["/Filter"]
+            if "/DecodeParms" in contents:
+                form[NameObject("/DecodeParms")] = contents["/DecodeParms"]
+        else:
+            form = DecodedStreamObject()
+            form.set_data(overlay_page.get_contents().get_data())
+            form = form.flate_encode()
+
+        box = overlay_page.mediabox
+        form[NameObject("/Type")] = NameObject("/XObject")
+        form[NameObject("/Subtype")] = NameObject("/Form")
+        form[NameObject("/BBox")] = ArrayObject(
+            FloatObject(v) for v in (box.left, box.bottom, box.right, box.top)
+        )
+        form[NameObject("/Resources")] = self.import_object(
+            dict.get(overlay_page, "/Resources", DictionaryObject())
+        )
+
+        reference = self.add_object(form)
+        # Hold the overlay so its id() stays unique while this output is built
+        self._forms[id(overlay_page)] = (overlay_page, reference)
+        return reference
+
+    def _wrapper_streams(self, name):
+        """Return the shared streams that isolate the page content and draw the overlay"""
+        if self._begin_stream is None:
+            begin = DecodedStreamObject()
+            begin.set_data(b"q\n")
+            self._begin_stream = self.add_object(begin)
+        if name not in self._end_streams:
+            end = DecodedStreamObject()
+            end.set_data(b"Q\nq " + name.encode() + b" Do Q\n")
+            self._end_streams[name] = self.add_object(end)
+        return self._begin_stream, self._end_streams[name]
+
+    def stamp(self, page, overlay_page):
+        """Draw overlay_page on top of page, a page dictionary in the output document"""
+        # Copy the resources (which may be shared with other pages) and add the overlay form
+        resources = dict.get(page, "/Resources")
+        resources = DictionaryObject() if resources is None else resources.get_object()
+        resources = DictionaryObject(dict.items(resources))
+        xobjects = dict.get(resources, "/XObject")
+        xobjects = DictionaryObject() if xobjects is None else xobjects.get_object()
+        xobjects = DictionaryObject(dict.items(xobjects))
+
+        suffix = 0
+        while f"/SigOverlay{suffix}" in xobjects:
+            suffix += 1
+        name = f"/SigOverlay{suffix}"
+        xobjects[NameObject(name)] = self.form(overlay_page)
+        resources[NameObject("/XObject")] = xobjects
+        page[NameObject("/Resources")] = resources
+
+        # Wrap the existing content in q/Q and draw the overlay after it
+        contents = dict.get(page, "/Contents")
+        if contents is None:
+            streams = []
+        elif isinstance(contents.get_object(), ArrayObject):
+            streams = list(contents.get_object())
+        elif isinstance(contents, IndirectObject):
+            streams = [contents]
+        else:
+            streams = [self.add_object(contents)]
+        begin, end = self._wrapper_streams(name)
+        page[NameObject("/Contents")] = ArrayObject([begin, *streams, end])
@@ -0,0 +1,183 @@
+"""
+Page Selection Rules
+Chooses which pages of a PDF to sign from specs like "all", "last", "1-3,7" or "text:Authorised signature"
+"""
+
+import re
+
+from pypdf.generic import ArrayObject
+
+# Literal strings without nested parentheses, and the escapes they may contain
+_LITERAL_STRING = re.compile(rb"\((?:[^()\\]|\\.)*\)", re.DOTALL)
+_UNESCAPED_OPEN = re.compile(rb"(?<!\\)\(")
+_ESCAPE = re.compile(rb"\\([0-7]{1,3}|\r\n|.)", re.DOTALL)
+_HEX_STRING = re.compile(rb"<[0-9A-Fa-f\s]*>")
+_INLINE_IMAGE = re.compile(rb"(?:^|\s)BI\s")
+_WHITESPACE = re.compile(r"\s+")
+
+_SIMPLE_ENCODINGS = ("/WinAnsiEncoding", "/StandardEncoding", "/MacRomanEncoding")
+
+_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f"}
+
+
+def _normalize(text):
+    """Case-fold text and drop whitespace so matches don't depend on line breaks"""
+    return _WHITESPACE.sub("", text).casefold()
+
+
+def _unescape(match):
+    escape = match.group(1)
+    if escape[:1].isdigit():
+        return bytes([int(escape, 8) & 0xFF])
+    if escape in (b"\n", b"\r", b"\r\n"):
+        return b""
+    return _ESCAPES.get(escape, escape)
+
+
+class PageTextIndex:
+    """Per-document cache of extracted page text used to evaluate text rules
+
+    Full text extraction parses every content stream operator, so pages are
+    first checked with a cheap scan of their literal strings. When a page only
+    uses simple single-byte fonts and the phrase is ASCII, that scan decides
+    the match without extracting anything; otherwise the page text is
+    extracted once and cached.
+    """
+
+    def __init__(self, reader):
+        self.reader = reader
+        self._texts = {}
+        self._literals = {}
+
+    def text(self, page_index):
+        """Return the extracted text of a page, extracting it at most once"""
+        if page_index not in self._texts:
+            self._texts[page_index] = self.reader.pages[page_index].extract_text() or ""
+        return self._texts[page_index]
+
+    def _literal_text(self, page_index):
+        """Return the page's literal string contents, or None if they can't be trusted"""
+        if page_index in self._literals:
+            return self._literals[page_index]
+
+        literal = None
+        page = self.reader.pages[page_index]
+        resources = page.get("/Resources")
+        resources = resources.get_object() if resources is not None else {}
+
+        if self._simple_resources(resources):
+            contents = page.get("/Contents")
+            contents = contents.get_object() if contents is not None else None
+            if contents is None:
+                data = b""
+            elif isinstance(contents, ArrayObject):
+                data = b"\n".join(stream.get_object().get_data() for stream in contents)
+            else:
+                data = contents.get_data()
+
+            strings = _LITERAL_STRING.findall(data)
+            # Nested parentheses, hex strings and inline images defeat the regex scan
+            if (len(strings) == len(_UNESCAPED_OPEN.findall(data))
+                    and not _HEX_STRING.search(data)
+                    and not _INLINE_IMAGE.search(data)):
+                joined = b"".join(_ESCAPE.sub(_unescape, s[1:-1]) for s in strings)
+                literal = _normalize(joined.decode("latin-1"))
+
+        self._literals[page_index] = literal
+        return literal
+
+    @staticmethod
+    def _simple_resources(resources):
+        """Return True if every font maps bytes straight to Latin text and no forms are drawn"""
+        xobjects = resources.get("/XObject")
+        if xobjects is not None:
+            for xobject in xobjects.get_object().values():
+                if xobject.get_object().get("/Subtype") == "/Form":
+                    return False
+
+        fonts = resources.get("/Font")
+        if fonts is None:
+            return True
+        for font in fonts.get_object().values():
+            font = font.get_object()
+            if font.get("/Subtype") not in ("/Type1", "/TrueType") or "/ToUnicode" in font:
+                return False
+            encoding = font.get("/Encoding")
+            if encoding is not None and encoding not in _SIMPLE_ENCODINGS:
+                return False
+        return True
+
+    def contains(self, page_index, needle):
+        """Return True if the page text contains needle, ignoring case and whitespace"""
+        needle = _normalize(needle)
+        # Simple encodings agree with Latin-1 on ASCII, so the raw strings are exact
+        if page_index not in self._texts and needle.isascii():
+            literal = self._literal_text(page_index)
+            if literal is not None:
+                return needle in literal
+        return needle in _normalize(self.text(page_index))
+
+    def search(self, needle):
+        """Return the indices of all pages whose text contains needle"""
+        return [i for i in range(len(self.reader.pages)) if self.contains(i, needle)]
+
+
+def _page_number(token, num_pages):
+    """Convert a 1-based page token ("7", "first", "last") to a 0-based index"""
+    if token == "first":
+        return 0
+    if token == "last":
+        return num_pages - 1
+    try:
+        number = int(token)
+    except ValueError:
+        raise ValueError(f"invalid page number '{token}'") from None
+    if number < 1:
+        raise ValueError(f"page numbers start at 1, got {number}")
+    return number - 1
+
+
+def select_pages(spec, num_pages, text_index=None):
+    """Return the sorted 0-based indices of the pages a selection spec picks
+
+    spec is a comma-separated list of terms: "all", "first", "last", a page
+    number, a range such as "2-5" or "3-last" (an open end like "3-" also
+    means to the last page), or "text:PHRASE" to pick pages containing
+    PHRASE. A text term must come last because PHRASE may contain commas.
+    Page numbers past the end of the document are ignored, so one spec can
+    be applied to documents of different lengths.
+    """
+    spec = str(spec).strip()
+    selected = set()
+
+    while spec:
+        if spec.lower().startswith("text:"):
+            phrase = spec[5:].strip()
+            if not phrase:
+                raise ValueError("text rule needs a phrase, e.g. 'text:Authorised signature'")
+            if text_index is None:
+                raise ValueError("text rules need a PageTextIndex for the document")
+            selected.update(text_index.search(phrase))
+            break
+
+        term, _, spec = spec.partition(",")
+        term = term.strip().lower()
+        spec = spec.strip()
+
+        if not term:
+            continue
+        if term in ("all", "*"):
+            selected.update(range(num_pages))
+        elif "-" in term:
+            start, _, end = term.partition("-")
+            first = _page_number(start.strip() or "first", num_pages)
+            last = _page_number(end.strip() or "last", num_pages)
+            if last < first:
+                raise ValueError(f"page range '{term}' is reversed")
+            selected.update(range(first, min(last, num_pages - 1) + 1))
+        else:
+            index = _page_number(term, num_pages)
+            if index < num_pages:
+                selected.add(index)
+
+    return sorted(selected)
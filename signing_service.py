@@ -0,0 +1,331 @@
+"""
+Signing Service
+Keeps warm worker processes and accepts signing jobs as JSON over stdin/stdout or local HTTP
+"""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from add_signature import (
+    add_signature_to_pdf,
+    default_output_path,
+    get_signature_overlay,
+    load_signature_asset,
+    load_signing_modules,
+)
+from anchor_placement import DEFAULT_OFFSET
+from instrumentation import SigningMetrics
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Set in each worker by _warm_worker
+_worker_signature = None
+
+
+def _warm_worker(signature_image, position, page_sizes, image_dpi=None):
+    """Pool initializer: decode the signature and pre-build the default overlays once per worker"""
+    global _worker_signature
+    _worker_signature = signature_image
+    asset = load_signature_asset(signature_image)
+    for page_size in page_sizes:
+        get_signature_overlay(asset, time.strftime("%d %m %Y"), position, page_size, image_dpi=image_dpi)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _run_job(job, defaults):
+    """Sign one job in a worker process and return its result dict"""
+    start = time.perf_counter()
+    result = {'id': job.get('id'), 'input': job.get('input'), 'ok': False}
+    try:
+        input_pdf = job.get('input')
+        if not input_pdf:
+            raise ValueError("job needs an 'input' path")
+        output_pdf = job.get('output') or default_output_path(input_pdf)
+        result['output'] = output_pdf
+        options = dict(defaults)
+        if 'x' in job or 'y' in job:
+            default_x, default_y = options['position']
+            options['position'] = (job.get('x', default_x), job.get('y', default_y))
+        for key in ('pages', 'incremental', 'anchors', 'image_dpi'):
+            if key in job:
+                options[key] = job[key]
+        if 'anchor_offset' in job:
+            options['anchor_offset'] = tuple(job['anchor_offset'])
+        signature_image = job.get('signature') or _worker_signature
+
+        metrics = SigningMetrics(trace_memory=False) if job.get('metrics') else None
+        output_dir = os.path.dirname(output_pdf)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        result['pages'] = add_signature_to_pdf(input_pdf, output_pdf, signature_image, metrics=metrics, **options)
+        if metrics is not None:
+            result['metrics'] = metrics.as_dict()
+        result['ok'] = True
+    except Exception as e:
+        # Failures are reported to the client; the worker stays up for the next job
+        result['error'] = str(e)
+    result['seconds'] = time.perf_counter() - start
+    result['worker'] = os.getpid()
+    return result
+
+
+class SigningService:
+    """A pool of pre-warmed worker processes that sign PDFs on request
+
+    Every worker decodes the signature and builds the overlays for the
+    default position once at start-up, and keeps its signature assets and
+    overlay cache for its lifetime, so a job only pays for its own PDF work.
+    Jobs are dicts with an "input" path and optional "id", "output", "x",
+    "y", "pages", "incremental", "anchors", "anchor_offset", "image_dpi",
+    "signature" and "metrics" keys; any option left out uses the service
+    defaults.
+    """
+
+    def __init__(self, signature_image, workers=None, position=(400, 100), pages='first', incremental=False,
+                 anchors=None, anchor_offset=DEFAULT_OFFSET, output_cache=None, image_dpi=None,
+                 warm_page_sizes=((612.0, 792.0), (595.2756, 841.8898))):
+        self.workers = workers or os.cpu_count() or 1
+        self.defaults = {
+            'position': tuple(position),
+            'pages': pages,
+            'incremental': incremental,
+            'anchors': anchors,
+            'anchor_offset': tuple(anchor_offset),
+            'output_cache': output_cache,
+            'image_dpi': image_dpi,
+        }
+        self.jobs_done = 0
+        self._lock = threading.Lock()
+        self._restart_lock = threading.Lock()
+        self._initargs = (signature_image, tuple(position), tuple(warm_page_sizes), image_dpi)
+        load_signing_modules()
+        self._executor = self._start_workers()
+
+    def _start_workers(self):
+        executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker, initargs=self._initargs)
+        # Start every worker now so the first jobs don't pay for process start-up
+        pings = [executor.submit(_ping) for _ in range(self.workers)]
+        for ping in pings:
+            ping.result()
+        return executor
+
+    def _replace_workers(self, broken):
+        """Swap a broken pool for a fresh one, once however many callers notice"""
+        with self._restart_lock:
+            if self._executor is broken:
+                broken.shutdown(wait=False)
+                self._executor = self._start_workers()
+            return self._executor
+
+    def submit(self, job):
+        """Queue a job and return a Future for its result dict
+
+        If a worker process dies (a crash in a C extension, SIGBUS, the OOM
+        killer) the jobs it took down get an error result and the next job
+        starts a fresh pool, so the service keeps running.
+        """
+        executor = self._executor
+        try:
+            future = executor.submit(_run_job, job, self.defaults)
+        except BrokenProcessPool:
+            future = self._replace_workers(executor).submit(_run_job, job, self.defaults)
+        result = Future()
+        future.add_done_callback(lambda done: self._finish(job, done, result))
+        return result
+
+    def sign(self, job):
+        """Sign one job and wait for its result dict"""
+        return self.submit(job).result()
+
+    def _finish(self, job, future, result):
+        try:
+            value = future.result()
+        except BrokenProcessPool:
+            value = {'id': job.get('id'), 'input': job.get('input'), 'ok': False,
+                     'error': "worker process died while signing this file"}
+        with self._lock:
+            self.jobs_done += 1
+        result.set_result(value)
+
+    def stats(self):
+        """Return the worker count and the number of jobs finished"""
+        with self._lock:
+            return {'workers': self.workers, 'jobs_done': self.jobs_done}
+
+    def close(self):
+        """Finish queued jobs and stop the workers"""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
+
+
+def serve_stdio(service, stdin=None, stdout=None):
+    """Read one JSON job per line from stdin and write one JSON result per line to stdout
+
+    Jobs run concurrently, so results are written as they finish and may
+    come back out of order; give each job an "id" to match them up. Returns
+    when stdin is closed and every job has finished.
+    """
+    stdin = sys.stdin if stdin is None else stdin
+    stdout = sys.stdout if stdout is None else stdout
+    write_lock = threading.Lock()
+    pending = []
+
+    def write(result):
+        with write_lock:
+            stdout.write(json.dumps(result) + "\n")
+            stdout.flush()
+
+    # Tell the client the workers are warm
+    write({'ready': True, **service.stats()})
+
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError("each line must be a JSON object")
+        except ValueError as e:
+            write({'id': None, 'ok': False, 'error': f"invalid job: {e}"})
+            continue
+        future = service.submit(job)
+        future.add_done_callback(lambda done: write(done.result()))
+        pending.append(future)
+
+    for future in pending:
+        future.result()
+
+
+class _SigningRequestHandler(BaseHTTPRequestHandler):
+    """POST /sign with a JSON job; GET /health for worker and job counts"""
+
+    service = None
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._reply(200, {'status': 'ok', **self.service.stats()})
+        else:
+            self._reply(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path != '/sign':
+            self._reply(404, {'error': 'not found'})
+            return
+        # Browsers send an Origin header with cross-site requests, and a plain HTML form can't
+        # send a JSON content type, so web pages can't make the service sign files
+        if self.headers.get('Origin') is not None:
+            self._reply(403, {'ok': False, 'error': 'requests from web pages are not accepted'})
+            return
+        content_type = self.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type != 'application/json':
+            self._reply(415, {'ok': False, 'error': 'Content-Type must be application/json'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            job = json.loads(self.rfile.read(length))
+            if not isinstance(job, dict):
+                raise ValueError("the request body must be a JSON object")
+        except ValueError as e:
+            self._reply(400, {'ok': False, 'error': f"invalid job: {e}"})
+            return
+        result = self.service.sign(job)
+        self._reply(200 if result['ok'] else 422, result)
+
+    def log_message(self, format, *args):
+        # Keep request logging on stderr, as the stdlib does, but only when asked
+        if os.environ.get('ADD_SIGNATURE_HTTP_LOG'):
+            super().log_message(format, *args)
+
+
+def serve_http(service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Serve signing jobs over HTTP until interrupted
+
+    Binds to localhost by default; jobs name files on this machine, so the
+    endpoint should not be exposed to other hosts. Requests must be sent as
+    application/json without an Origin header, which keeps web pages open
+    in a local browser from submitting jobs.
+    """
+    handler = type('SigningRequestHandler', (_SigningRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Signing service listening on http://{host}:{server.server_address[1]} "
+          f"with {service.workers} workers", file=sys.stderr)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    # Shut down on SIGTERM as well as Ctrl-C so the workers don't outlive the server
+    previous = signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+        server.server_close()
+
+
+class StdioClient:
+    """Drives a signing daemon started as a subprocess over its stdin/stdout protocol
+
+    Needs no network access, which makes it suitable for tests and local
+    scripts. Jobs are sent one at a time and each call waits for its result.
+    """
+
+    def __init__(self, signature_image, *args):
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'add_signature.py')
+        self.process = subprocess.Popen(
+            [sys.executable, script, '--serve', 'stdio', '-s', signature_image, *args],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, bufsize=1,
+        )
+        self.ready = json.loads(self.process.stdout.readline())
+        self._next_id = 0
+
+    def sign(self, input_pdf, **job):
+        """Sign input_pdf with the given job options and return the result dict"""
+        self._next_id += 1
+        job.update(id=self._next_id, input=input_pdf)
+        self.process.stdin.write(json.dumps(job) + "\n")
+        self.process.stdin.flush()
+        line = self.process.stdout.readline()
+        if not line:
+            raise RuntimeError("signing service exited")
+        return json.loads(line)
+
+    def close(self):
+        """Close the daemon's stdin and wait for it to exit"""
+        self.process.stdin.close()
+        return self.process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+        return False
@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Two Letter pages that inherit their resources from the page tree and draw the same content stream
+SHARED_CONTENT_OBJECTS = {
+    1: b"<< /Type /Catalog /Pages 2 0 R >>",
+    2: b"<< /Type /Pages /Kids [3 0 R 4 0 R] /Count 2 /MediaBox [0 0 612 792]"
+       b" /Resources << /Font << /F1 6 0 R >> >> >>",
+    3: b"<< /Type /Page /Parent 2 0 R /Contents 5 0 R >>",
+    4: b"<< /Type /Page /Parent 2 0 R /Contents 5 0 R >>",
+    5: b"<< /Length 43 >>\nstream\nBT /F1 12 Tf 72 700 Td (Shared text) Tj ET\nendstream",
+    6: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+}
+
+
+def build_pdf(objects, xref_stream=False):
+    """Return the bytes of a PDF holding objects (number -> body), with a classic xref table or an xref stream"""
+    data = bytearray(b"%PDF-1.5\n%\xe2\xe3\xcf\xd3\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(data)
+        data += b"%d 0 obj\n%s\nendobj\n" % (number, objects[number])
+
+    size = max(objects) + 1
+    startxref = len(data)
+    if xref_stream:
+        # The xref stream is an object itself and lists its own offset
+        offsets[size] = startxref
+        rows = b"\x00" + (0).to_bytes(4, "big") + (65535).to_bytes(2, "big")
+        rows += b"".join(b"\x01" + offsets[n].to_bytes(4, "big") + b"\x00\x00" for n in range(1, size + 1))
+        data += b"%d 0 obj\n<< /Type /XRef /Size %d /W [1 4 2] /Root 1 0 R /Length %d >>\nstream\n" % (
+            size, size + 1, len(rows))
+        data += rows + b"\nendstream\nendobj\n"
+    else:
+        data += b"xref\n0 %d\n0000000000 65535 f\r\n" % size
+        data += b"".join(b"%010d 00000 n\r\n" % offsets[n] for n in range(1, size))
+        data += b"trailer\n<< /Size %d /Root 1 0 R >>\n" % size
+    data += b"startxref\n%d\n%%%%EOF\n" % startxref
+    return bytes(data)
+
+
+@pytest.fixture
+def signature_png(tmp_path):
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGBA", (300, 100), (255, 255, 255, 0))
+    ImageDraw.Draw(image).line([(10, 80), (120, 20), (290, 70)], fill=(0, 0, 128, 255), width=6)
+    path = tmp_path / "signature.png"
+    image.save(path)
+    return str(path)
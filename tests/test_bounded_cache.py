@@ -0,0 +1,32 @@
+from bounded_cache import BoundedCache
+
+
+def test_evicts_least_recently_used_entry():
+    cache = BoundedCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.get("b", "missing") == "missing"
+    assert cache.stats() == {"hits": 3, "misses": 1, "entries": 2, "size": 2, "max_size": 2}
+
+
+def test_size_budget_keeps_the_newest_entry():
+    cache = BoundedCache(10, sizeof=len)
+    cache.put("a", b"12345")
+    cache.put("b", b"1234")
+    cache.put("a", b"123")
+    assert cache.size == 7
+    cache.put("big", b"x" * 50)
+    assert len(cache) == 1 and cache.get("big") == b"x" * 50 and cache.size == 50
+
+
+def test_clear_resets_counters():
+    cache = BoundedCache(4)
+    cache.put("a", None)
+    cache.get("a")
+    cache.get("b")
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "entries": 0, "size": 0, "max_size": 4}
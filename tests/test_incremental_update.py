@@ -0,0 +1,109 @@
+import io
+import os
+from datetime import datetime
+
+import pytest
+from pypdf import PdfReader
+
+from add_signature import add_signature_to_pdf, create_signature_overlay
+from conftest import SHARED_CONTENT_OBJECTS, build_pdf
+from incremental_update import IncrementalUpdate
+from mapped_file import MappedFile
+
+DATE = "01 02 2026"
+
+
+def assert_xref_offsets(data):
+    """Check that every object the xref sections list starts at its recorded offset"""
+    reader = PdfReader(io.BytesIO(data), strict=True)
+    for generation, entries in reader.xref.items():
+        for number, offset in entries.items():
+            if number == 0:
+                continue
+            assert data[offset:].startswith(b"%d %d obj" % (number, generation)), number
+    return reader
+
+
+def sign_first_page(source, output, signature_png):
+    reader = PdfReader(source)
+    update = IncrementalUpdate(reader)
+    overlay = create_signature_overlay(signature_png, DATE, (400, 100), (612, 792)).pages[0]
+    update.merge_overlay(0, overlay)
+    return update.write(source, output)
+
+
+@pytest.mark.parametrize("xref_stream", [False, True], ids=["xref-table", "xref-stream"])
+def test_write_appends_update(tmp_path, signature_png, xref_stream):
+    original = build_pdf(SHARED_CONTENT_OBJECTS, xref_stream)
+    output = io.BytesIO()
+    written = sign_first_page(io.BytesIO(original), output, signature_png)
+
+    data = output.getvalue()
+    assert written == len(data)
+    assert data.startswith(original)
+    update = data[len(original):]
+    if xref_stream:
+        assert b"/Type /XRef" in update and b"\nxref\n" not in update
+    else:
+        assert b"\nxref\n" in update and b"trailer" in update
+    assert b"/Prev %d" % int(original.rsplit(b"startxref", 1)[1].split()[0]) in update
+
+    reader = assert_xref_offsets(data)
+    assert len(reader.pages) == 2
+    assert DATE in reader.pages[0].extract_text()
+    assert DATE not in reader.pages[1].extract_text()
+
+
+def test_pages_sharing_a_content_stream(signature_png):
+    output = io.BytesIO()
+    sign_first_page(io.BytesIO(build_pdf(SHARED_CONTENT_OBJECTS)), output, signature_png)
+
+    reader = PdfReader(output)
+    signed, unsigned = reader.pages
+    # The shared stream is wrapped, not rewritten, so the other page still draws it unchanged
+    assert unsigned.get("/Contents").idnum == 5
+    assert 5 in [stream.idnum for stream in signed.get("/Contents")]
+    assert "Shared text" in signed.extract_text() and "Shared text" in unsigned.extract_text()
+    # Resources inherited from the page tree still reach the page's own text
+    assert "/F1" in signed["/Resources"]["/Font"]
+
+
+def test_write_to_input_path(tmp_path, signature_png):
+    original = build_pdf(SHARED_CONTENT_OBJECTS)
+    path = tmp_path / "in-place.pdf"
+    path.write_bytes(original)
+    os.chmod(path, 0o640)
+
+    with MappedFile(path) as source:
+        sign_first_page(source, str(path), signature_png)
+
+    data = path.read_bytes()
+    assert data.startswith(original) and len(data) > len(original)
+    assert DATE in assert_xref_offsets(data).pages[0].extract_text()
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    # No temporary file left behind
+    assert sorted(os.listdir(tmp_path)) == ["in-place.pdf", "signature.png"]
+
+
+def test_failed_write_leaves_output_untouched(tmp_path, signature_png):
+    path = tmp_path / "target.pdf"
+    path.write_bytes(b"previous")
+    broken = io.BytesIO(b"%PDF-1.4\nno cross-reference here\n")
+    update = IncrementalUpdate(PdfReader(io.BytesIO(build_pdf(SHARED_CONTENT_OBJECTS))))
+
+    with pytest.raises(ValueError):
+        update.write(broken, str(path))
+    assert path.read_bytes() == b"previous"
+    assert sorted(os.listdir(tmp_path)) == ["signature.png", "target.pdf"]
+
+
+@pytest.mark.parametrize("incremental", [False, True], ids=["rewrite", "incremental"])
+def test_add_signature_in_place(tmp_path, signature_png, incremental):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(build_pdf(SHARED_CONTENT_OBJECTS, xref_stream=True))
+
+    assert add_signature_to_pdf(str(path), str(path), signature_png, pages="last", incremental=incremental) == 2
+    reader = PdfReader(path)
+    assert len(reader.pages) == 2
+    assert "Shared text" in reader.pages[1].extract_text()
+    assert datetime.now().strftime("%d %m %Y") in reader.pages[1].extract_text()
@@ -0,0 +1,118 @@
+import io
+import os
+
+import pytest
+
+import output_cache
+from output_cache import OutputCache, file_digest
+
+
+def put_entry(cache, name, size, mtime):
+    """Store size bytes under a key derived from name and give the entry a fixed modification time"""
+    key = OutputCache.key(name, "signature")
+    cache.put(key, io.BytesIO(b"x" * size), 1)
+    path, _ = cache._find(key)
+    os.utime(path, (mtime, mtime))
+    return key
+
+
+def test_miss_then_hit(tmp_path):
+    cache = OutputCache(tmp_path / "cache")
+    key = OutputCache.key("input-digest", "signature-digest", pages="last")
+    assert cache.get(key, io.BytesIO()) is None
+
+    cache.put(key, io.BytesIO(b"%PDF signed"), 3)
+    output = io.BytesIO()
+    assert cache.get(key, output) == 3
+    assert output.getvalue() == b"%PDF signed"
+
+    path_output = tmp_path / "signed.pdf"
+    assert cache.get(key, str(path_output)) == 3
+    assert path_output.read_bytes() == b"%PDF signed"
+
+
+def test_key_covers_options():
+    base = OutputCache.key("input", "signature", pages="last", position=(400, 100))
+    assert base == OutputCache.key("input", "signature", position=(400, 100), pages="last")
+    assert base != OutputCache.key("input", "signature", pages="first", position=(400, 100))
+    assert base != OutputCache.key("input", "other signature", pages="last", position=(400, 100))
+
+
+def test_put_from_path(tmp_path):
+    cache = OutputCache(tmp_path / "cache")
+    source = tmp_path / "signed.pdf"
+    source.write_bytes(b"%PDF from a file")
+    cache.put("ab" * 32, str(source), 2)
+    output = io.BytesIO()
+    assert cache.get("ab" * 32, output) == 2
+    assert output.getvalue() == b"%PDF from a file"
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = OutputCache(tmp_path / "cache", max_bytes=250)
+    first = put_entry(cache, "first", 100, 1000)
+    second = put_entry(cache, "second", 100, 2000)
+    # A hit makes the oldest entry the most recently used
+    assert cache.get(first, io.BytesIO()) == 1
+    third = put_entry(cache, "third", 100, 3000)
+
+    assert cache.get(second, io.BytesIO()) is None
+    assert cache.get(first, io.BytesIO()) == 1
+    assert cache.get(third, io.BytesIO()) == 1
+    assert cache.stats() == {"entries": 2, "bytes": 200, "max_bytes": 250}
+
+
+def test_eviction_frees_room_below_the_cap(tmp_path):
+    cache = OutputCache(tmp_path / "cache", max_bytes=1000)
+    for number in range(10):
+        put_entry(cache, f"entry-{number}", 100, 1000 + number)
+    put_entry(cache, "one more", 100, 2000)
+    assert cache.stats()["bytes"] <= 1000 * output_cache.EVICT_TARGET
+
+
+def test_rescan_counts_other_writers(tmp_path, monkeypatch):
+    monkeypatch.setattr(output_cache, "RESCAN_INTERVAL", 2)
+    cache = OutputCache(tmp_path / "cache", max_bytes=250)
+    other = OutputCache(tmp_path / "cache", max_bytes=10 ** 9)
+    put_entry(cache, "own", 100, 1000)
+    put_entry(other, "other-1", 100, 2000)
+    put_entry(other, "other-2", 100, 3000)
+    # The running total only counts this cache's own entries until the next rescan
+    put_entry(cache, "own-2", 100, 4000)
+    assert cache.stats()["bytes"] == 400
+    put_entry(cache, "own-3", 100, 5000)
+    assert cache.stats()["bytes"] <= 250
+
+
+def test_stale_temporary_files_are_removed(tmp_path):
+    cache = OutputCache(tmp_path / "cache")
+    folder = tmp_path / "cache" / "ab"
+    folder.mkdir()
+    stale = folder / ".tmp-crashed"
+    stale.write_bytes(b"partial")
+    os.utime(stale, (0, 0))
+    fresh = folder / ".tmp-writing"
+    fresh.write_bytes(b"partial")
+
+    assert cache.stats()["entries"] == 0
+    assert not stale.exists() and fresh.exists()
+
+
+@pytest.mark.parametrize("make_source", [
+    lambda path: str(path),
+    lambda path: open(path, "rb"),
+    lambda path: io.BytesIO(path.read_bytes()),
+], ids=["path", "file", "bytesio"])
+def test_file_digest_sources_agree(tmp_path, make_source):
+    path = tmp_path / "data.bin"
+    path.write_bytes(os.urandom(3000))
+    expected = file_digest(str(path))
+    source = make_source(path)
+    if hasattr(source, "seek"):
+        source.seek(10)
+    assert file_digest(source, chunk_size=1024) == expected
+    if hasattr(source, "tell"):
+        # Left where it was
+        assert source.tell() == 10
+        if hasattr(source, "close"):
+            source.close()
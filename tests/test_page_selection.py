@@ -0,0 +1,52 @@
+import pytest
+
+from page_selection import select_pages
+
+
+class FakeTextIndex:
+    def __init__(self, texts):
+        self.texts = texts
+
+    def search(self, needle):
+        return [i for i, text in enumerate(self.texts) if needle.lower() in text.lower()]
+
+
+@pytest.mark.parametrize("spec, expected", [
+    ("all", [0, 1, 2, 3, 4]),
+    ("*", [0, 1, 2, 3, 4]),
+    ("first", [0]),
+    ("last", [4]),
+    ("2", [1]),
+    ("2-4", [1, 2, 3]),
+    ("3-last", [2, 3, 4]),
+    ("3-", [2, 3, 4]),
+    ("-2", [0, 1]),
+    ("1, last", [0, 4]),
+    ("LAST,First", [0, 4]),
+    ("2,2,1-2", [0, 1]),
+    ("4-99", [3, 4]),
+    ("99", []),
+    (" , 2 ,", [1]),
+    (3, [2]),
+])
+def test_select_pages(spec, expected):
+    assert select_pages(spec, 5) == expected
+
+
+def test_text_rule_takes_the_rest_of_the_spec():
+    index = FakeTextIndex(["cover", "Terms, and conditions", "Authorised signature", "terms, AND more"])
+    assert select_pages("first, text:terms, and", 4, index) == [0, 1, 3]
+    assert select_pages("TEXT: signature", 4, index) == [2]
+
+
+@pytest.mark.parametrize("spec, message", [
+    ("0", "start at 1"),
+    ("-1-2", "invalid page number"),
+    ("two", "invalid page number"),
+    ("4-2", "reversed"),
+    ("text:", "needs a phrase"),
+    ("text:Signature", "PageTextIndex"),
+])
+def test_invalid_specs(spec, message):
+    with pytest.raises(ValueError, match=message):
+        select_pages(spec, 5)